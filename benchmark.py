@@ -0,0 +1,413 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Exporter benchmarks on synthetic libraries: generates realistic “GOG Galaxy 2 exporter”
+    CSVs, times `Main()` end to end and its hot helpers, and compares the throughput against
+    a stored baseline. Runs offline, without images.
+"""
+
+from contextlib import redirect_stdout
+import csv
+from functools import cmp_to_key
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import json
+from os import chdir, getcwd, listdir, makedirs
+from os.path import abspath, basename, dirname, exists, join
+import random
+from shutil import copy, copytree, rmtree
+import tempfile
+import threading
+from time import perf_counter
+
+from natsort import natsorted
+
+import csv_parser
+
+__maintainer__ = "Bruno “Varstahl” Passeri"
+
+def generateCSV(fileName, rows, bPythonLists=False, seed=0):
+	""" Writes a synthetic library of `rows` games, with lists either tab separated or
+	    Python parseable as with `--py-lists`
+	"""
+	rnd = random.Random(seed)
+	words = ['dark', 'souls', 'legacy', 'kain', 'shadow', 'warrior', 'fallout', 'deus', 'ex', 'witcher', 'hexcells',
+		'blind', 'forest', 'hazard', 'dungeon', 'keeper', 'warhammer', 'dawn', 'war', 'crusade', 'über', 'pokémon',
+		'night', 'city', 'star', 'wars', 'knights', 'old', 'republic', 'age', 'empires', 'heroes', 'might', 'magic']
+	articles = ['', '', '', 'The ', 'A ', 'An ', 'Il ', "L'"]
+	suffixes = ['', '', '', ' II', ' III', ' IV', ' V', ' VI', ' IX', ' XIII', ' 2', ' 3', ' 40,000', ': Game of the Year Edition',
+		' - Remastered', '...', '™', ' (TM)', ' ®']
+	platforms = list(csv_parser.platformIcons.short.values())
+	people = ['{} {}'.format(rnd.choice(['Obsidian', 'Bethesda', 'CD Projekt', 'Eidos', 'Relic', 'Ubisoft', 'Valve', 'Arkane', 'Paradox']),
+		rnd.choice(['Entertainment', 'Studios', 'RED', 'Montréal', 'Software', 'Interactive'])) for _ in range(60)]
+	genres = ['Action', 'Adventure', 'RPG', 'Strategy', 'Puzzle', 'Shooter', 'Simulator', 'Indie', 'Racing', 'Sport']
+	themes = ['Fantasy', 'Sci-fi', 'Horror', 'Open world', 'Historical', 'Stealth', 'Survival', 'Comedy']
+	tags = ['Favorite', 'Backlog', 'Completed', 'Multiplayer', 'Co-op']
+
+	def sentence():
+		return ' '.join(rnd.choice(words) for _ in range(rnd.randint(8, 20))).capitalize() + rnd.choice(['.', '...', '!', ' - really.'])
+
+	def summary():
+		parts = []
+		for _ in range(rnd.randint(2, 6)):
+			kind = rnd.random()
+			if kind < 0.5:
+				parts.append('<p>{}</p>'.format(' '.join(sentence() for _ in range(rnd.randint(1, 4)))))
+			elif kind < 0.7:
+				parts.append('<p class="{}">{}</p>'.format(rnd.choice(['description__text', 'lead', 'module']), sentence()))
+			elif kind < 0.9:
+				parts.append('\\n'.join('{} {}'.format(rnd.choice(['*', '•', '-']), sentence()) for _ in range(rnd.randint(2, 5))))
+			else:
+				parts.append('\\n\\n' + sentence() + ' \u0093quoted\u0094 \u0097 it\u0092s')
+		return '\\n'.join(parts)
+
+	def values(pool, a, b):
+		v = rnd.sample(pool, rnd.randint(a, b))
+		return repr(v) if bPythonLists else '\t'.join(v)
+
+	def image():
+		return 'https://images.gog-statics.com/{:064x}.{}{}'.format(rnd.getrandbits(256), rnd.choice(['jpg', 'png', 'webp']),
+			'?namespace=gamesdb' if rnd.random() < 0.4 else '')
+
+	fields = ['releaseKey', 'gameId', 'title', 'summary', 'platformList', 'developers', 'publishers', 'releaseDate', 'genres',
+		'themes', 'criticsScore', 'gameMins', 'dlcs', 'tags', 'verticalCover', 'backgroundImage', 'squareIcon', 'isHidden']
+	with open(fileName, 'w', encoding='utf-8', newline='') as f:
+		writer = csv.DictWriter(f, fieldnames=fields, delimiter='\t')
+		writer.writeheader()
+		for i in range(rows):
+			title = rnd.choice(articles) + ' '.join(rnd.choice(words) for _ in range(rnd.randint(1, 4))).title() + rnd.choice(suffixes)
+			writer.writerow({
+				'releaseKey': 'steam_{}'.format(i),
+				'gameId': str(i),
+				'title': title,
+				'summary': summary() if rnd.random() < 0.95 else '',
+				'platformList': values(platforms, 1, 6),
+				'developers': values(people, 1, 3),
+				'publishers': values(people, 1, 2),
+				'releaseDate': '{}-{:02d}-{:02d}'.format(rnd.randint(1985, 2021), rnd.randint(1, 12), rnd.randint(1, 28)) if rnd.random() < 0.9 else '',
+				'genres': values(genres, 0, 3),
+				'themes': values(themes, 0, 3),
+				'criticsScore': str(rnd.randint(40, 99)) if rnd.random() < 0.6 else '',
+				'gameMins': str(rnd.choice([0, 0, rnd.randint(1, 60), rnd.randint(60, 10000)])),
+				'dlcs': values(['Season Pass', 'Soundtrack', 'Artbook', 'Expansion Pack', 'Bonus Content'], 0, 3),
+				'tags': values(tags, 0, 2),
+				'verticalCover': image() if rnd.random() < 0.9 else '',
+				'backgroundImage': image(),
+				'squareIcon': image(),
+				'isHidden': 'False',
+			})
+
+def timeMain(directory, fileCSV, bPythonLists=False, jobs=1):
+	""" Runs a full `--html5` export in `directory` rendering with `jobs` processes, returns the elapsed seconds """
+	args = csv_parser.parseArguments(['--html5', '-i', fileCSV, '-o', 'index.html', '-j', str(jobs)] + (['--py-lists'] if bPythonLists else []))
+	cwd = getcwd()
+	chdir(directory)
+	try:
+		options = csv_parser.loadOptions()
+		csv_parser.options = options  # Used by the helpers
+		start = perf_counter()
+		with redirect_stdout(io.StringIO()):
+			csv_parser.Main(args, options)
+		return perf_counter() - start
+	finally:
+		chdir(cwd)
+
+def timeHelpers(fileCSV):
+	""" Times the hot helpers on the rows of the CSV, returns {name: (calls, seconds)}.
+	    The memoized helpers start from an empty cache.
+	"""
+	with open(fileCSV, 'r', encoding='utf-8', newline='') as f:
+		rows = list(csv.DictReader(f, delimiter='\t'))
+	titles = [x['title'] for x in rows]
+	words = [w for x in titles for w in x.lower().split(' ')]
+	summaries = [x['summary'] for x in rows if x['summary']]
+	urls = [x['backgroundImage'] for x in rows]
+	platforms = [x['platformList'].split('\t') for x in rows]
+
+	results = {}
+	for name, f, data in [
+		('description()', csv_parser.description, summaries),
+		('clean()', csv_parser.clean, titles),
+		('titleData()', lambda x: csv_parser.titleData(x, csv_parser.options), titles),
+		('roman_numeral()', csv_parser.roman_numeral, words),
+		('pathFromURL()', csv_parser.pathFromURL, urls),
+		('platformIcons()', csv_parser.platformIcons, platforms),
+	]:
+		for memoized in [csv_parser.clean, csv_parser.paragraphTag, csv_parser.roman_numeral]:
+			memoized.cache_clear()
+		start = perf_counter()
+		for x in data:
+			f(x)
+		results[name] = (len(data), perf_counter() - start)
+	return results
+
+def legacySortableTitle(customSort):
+	""" The pairwise comparator `sortGames` replaced, kept as the reference ordering """
+	def sortableTitle(a, b):
+		for cs in customSort:
+			if (a['title'] in cs) and (b['title'] in cs):
+				ai = cs.index(a['title'])
+				bi = cs.index(b['title'])
+				if ai == bi:
+					return 0
+				elif ai < bi:
+					return -1
+				else:
+					return 1
+		if a['_titleTL'] == b['_titleTL']:
+			return 0
+		ns = natsorted([a['_titleTL'], b['_titleTL']])
+		return -1 if ns[0] == a['_titleTL'] else 1
+	return sortableTitle
+
+def checkSort(fileCSV, seed=0):
+	""" Sorts the games of the CSV with overlapping customSort groups, both with the legacy
+	    comparator and with `sortGames`, and asserts that the two orders are the same
+	"""
+	def makeOptions(customSort):
+		return csv_parser.Options({'ignorePlatforms': [], 'ignoreGames': [], 'rename': {}, 'merge': [], 'sortAs': {}, 'customSort': customSort})
+
+	with open(fileCSV, 'r', encoding='utf-8', newline='') as f:
+		rows = list(csv.DictReader(f, delimiter='\t'))
+	options = makeOptions([])
+	games = []
+	for i, row in enumerate(rows):
+		title, titleTL, _ = csv_parser.titleData(row['title'], options)
+		games.append({'id': i, 'title': title, '_titleTL': titleTL})
+
+	# Groups drawn from a small pool of titles, so that most of them share some titles
+	rnd = random.Random(seed)
+	pool = rnd.sample([x['title'] for x in games], min(len(games), 40))
+	customSort = [rnd.sample(pool, rnd.randint(2, min(len(pool), 16))) for _ in range(30)]
+	options = makeOptions(customSort)
+
+	legacy = [x['id'] for x in sorted(games, key=cmp_to_key(legacySortableTitle(customSort)))]
+	current = [x['id'] for x in csv_parser.sortGames(games, options.customIndex)]
+	assert legacy == current, 'sort order differs from the legacy comparator at position {}'.format(
+		next(i for i, (a, b) in enumerate(zip(legacy, current)) if a != b))
+	return len(games), len(customSort)
+
+def checkDownload(directory, count=200, workers=4):
+	""" Downloads `count` images from a local stand-in server with `ImageDownloader`, and asserts
+	    that the flaky 503s, the dropped connections and the redirects are all recovered from,
+	    that the 404 is the only failure, and that the connections are kept alive.
+	    Returns the (requests, connections) counts.
+	"""
+	lock = threading.Lock()
+	seen = set()
+	stats = {'requests': 0, 'connections': 0}
+
+	class Handler(BaseHTTPRequestHandler):
+		protocol_version = 'HTTP/1.1'  # Keep-alive
+
+		def setup(self):
+			super().setup()
+			with lock:
+				stats['connections'] += 1
+
+		def do_GET(self):
+			with lock:
+				stats['requests'] += 1
+				bFirst = self.path not in seen
+				seen.add(self.path)
+			kind, _, name = self.path.strip('/').partition('/')
+			if 'missing' == kind:
+				self.reply(404)
+			elif 'flaky' == kind and bFirst:
+				self.reply(503)
+			elif 'drop' == kind and bFirst:
+				self.close_connection = True  # No response at all
+			elif 'moved' == kind:
+				self.reply(301, headers={'Location': '/image/' + name})
+			else:
+				self.reply(200, name.encode('utf-8'))
+
+		def reply(self, status, body=b'', headers={}):
+			self.send_response(status)
+			for k, v in headers.items():
+				self.send_header(k, v)
+			self.send_header('Content-Length', str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+
+		def log_message(self, *args):
+			pass
+
+	server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	try:
+		kinds = ['image', 'image', 'flaky', 'drop', 'moved']
+		items = [('http://127.0.0.1:{}/{}/{}.jpg'.format(server.server_port, kinds[i % len(kinds)], i), join(directory, '{}.jpg'.format(i))) for i in range(count)]
+		missing = 'http://127.0.0.1:{}/missing/x.jpg'.format(server.server_port)
+		items.append((missing, join(directory, 'missing.jpg')))
+		downloaded, failed = csv_parser.ImageDownloader(workers, backoff=0.01, timeout=5).download(items)
+	finally:
+		server.shutdown()
+		server.server_close()
+
+	assert (count, [missing]) == (downloaded, failed), 'downloaded {} of {} images, failed {}'.format(downloaded, count, failed)
+	for url, path in items[:-1]:
+		with open(path, 'rb') as f:
+			assert f.read() == basename(url).encode('utf-8'), 'wrong content in “{}”'.format(path)
+	assert not [x for x in listdir(directory) if x.endswith('.part')], 'partial downloads left behind'
+	assert stats['connections'] < stats['requests'] / 4, 'connections not kept alive: {} for {} requests'.format(stats['connections'], stats['requests'])
+	return stats['requests'], stats['connections']
+
+def Main(args):
+	if args.bCheckDownload:
+		directory = tempfile.mkdtemp(prefix='exporter-benchmark-')
+		try:
+			requests, connections = checkDownload(directory)
+		finally:
+			rmtree(directory, ignore_errors=True)
+		print('Downloader recovered from the failures: {} requests over {} connections'.format(requests, connections))
+		return
+
+	if args.bCheckSort:
+		directory = tempfile.mkdtemp(prefix='exporter-benchmark-')
+		try:
+			fileCSV = join(directory, 'gameDB-sort.csv')
+			generateCSV(fileCSV, args.helperRows, False, args.seed)
+			games, groups = checkSort(fileCSV, args.seed)
+		finally:
+			rmtree(directory, ignore_errors=True)
+		print('Sort order matches the legacy comparator: {} games, {} customSort groups'.format(games, groups))
+		return
+
+	directory = tempfile.mkdtemp(prefix='exporter-benchmark-')
+	source = dirname(abspath(csv_parser.__file__))
+	copytree(join(source, 'templates'), join(directory, 'templates'))
+	copytree(join(source, 'assets'), join(directory, 'assets'))
+	copy(join(source, 'options.example.json'), join(directory, 'options.json'))
+	makedirs(join(directory, 'images'))
+	modes = [args.modes] if isinstance(args.modes, str) else args.modes  # Single values are unwrapped
+
+	# Run the benchmarks
+	results = {}
+	try:
+		for rows in args.rows:
+			for mode in modes:
+				fileCSV = join(directory, 'gameDB-{}-{}.csv'.format(rows, mode))
+				generateCSV(fileCSV, rows, 'py' == mode, args.seed)
+				for jobs in args.jobs:
+					name = 'Main() {} {}'.format(mode, rows) + (' -j {}'.format(jobs) if 1 != jobs else '')
+					results[name] = (rows, timeMain(directory, fileCSV, 'py' == mode, jobs))
+
+		fileCSV = join(directory, 'gameDB-helpers.csv')
+		generateCSV(fileCSV, args.helperRows, False, args.seed)
+		results.update(timeHelpers(fileCSV))  # With the options loaded by the last `timeMain`
+	finally:
+		rmtree(directory, ignore_errors=True)
+
+	# Compare against the baseline
+	baseline = {}
+	if exists(args.baseline):
+		with open(args.baseline, 'r', encoding='utf-8') as f:
+			baseline = json.load(f)
+	print('{:<26}{:>10}{:>12}{:>14}{:>14}{:>10}'.format('Benchmark', 'Rows', 'Time (s)', 'Rows/s', 'Baseline', 'Change'))
+	report = {}
+	for name, (rows, seconds) in results.items():
+		throughput = rows / seconds if seconds else 0
+		report[name] = throughput
+		base = baseline.get(name)
+		print('{:<26}{:>10}{:>12.3f}{:>14.0f}{:>14}{:>10}'.format(
+			name, rows, seconds, throughput,
+			'{:.0f}'.format(base) if base else '',
+			'{:+.1f}%'.format(100 * (throughput - base) / base) if base else '',
+		))
+
+	if args.save:
+		with open(args.baseline, 'w', encoding='utf-8') as f:
+			json.dump(report, f, indent='\t')
+		print('Baseline saved in “{}”'.format(args.baseline))
+
+if "__main__" == __name__:
+	args = csv_parser.Arguments(
+		[
+			[
+				['-r', '--rows'],
+				{
+					'default': [1000, 10000, 100000],
+					'type': int,
+					'nargs': '+',
+					'required': False,
+					'metavar': 'N',
+					'help': 'library sizes to benchmark `Main()` with (defaults to 1000 10000 100000)',
+					'dest': 'rows',
+				}
+			],
+			[
+				['-m', '--modes'],
+				{
+					'default': ['tab', 'py'],
+					'choices': ['tab', 'py'],
+					'nargs': '+',
+					'required': False,
+					'help': 'CSV list formats: tab separated and/or Python lists as with `--py-lists` (defaults to both)',
+					'dest': 'modes',
+				}
+			],
+			[
+				['-j', '--jobs'],
+				{
+					'default': [1],
+					'type': int,
+					'nargs': '+',
+					'required': False,
+					'metavar': 'N',
+					'help': 'numbers of rendering processes to benchmark `Main()` with, e.g. `-j 1 4` (defaults to 1)',
+					'dest': 'jobs',
+				}
+			],
+			[
+				['--helper-rows'],
+				{
+					'default': 10000,
+					'type': int,
+					'required': False,
+					'metavar': 'N',
+					'help': 'number of rows to benchmark the helpers with (defaults to 10000)',
+					'dest': 'helperRows',
+				}
+			],
+			[
+				['-b', '--baseline'],
+				{
+					'default': 'benchmark.json',
+					'type': str,
+					'required': False,
+					'metavar': 'FN',
+					'help': 'baseline to compare the results against (defaults to `benchmark.json`)',
+					'dest': 'baseline',
+				}
+			],
+			[['--save'], {'action': 'store_true', 'help': 'save the results as the new baseline', 'dest': 'save'}],
+			[
+				['--check-sort'],
+				{
+					'action': 'store_true',
+					'help': 'instead of benchmarking, check that the sort order on `--helper-rows` games with overlapping customSort groups matches the legacy comparator',
+					'dest': 'bCheckSort',
+				}
+			],
+			[
+				['--check-download'],
+				{
+					'action': 'store_true',
+					'help': 'instead of benchmarking, check the image downloader against a local stand-in server with failing, dropped and redirected requests',
+					'dest': 'bCheckDownload',
+				}
+			],
+			[
+				['--seed'],
+				{
+					'default': 0,
+					'type': int,
+					'required': False,
+					'help': 'random seed of the synthetic libraries',
+					'dest': 'seed',
+				}
+			],
+		],
+		description='GOG Galaxy 2 export converter benchmarks on synthetic libraries'
+	)
+	Main(args)
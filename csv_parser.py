@@ -3,20 +3,46 @@
 
 import argparse
 from ast import literal_eval
-from functools import cmp_to_key
-from html import escape
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import cProfile
+import filecmp
+from fnmatch import translate
+from functools import lru_cache
+import gzip
+from hashlib import sha1
+from html import escape, unescape
 from html.parser import HTMLParser
+import http.client
 import json
+from itertools import chain, islice
 from math import floor
 from operator import itemgetter
-from os import getcwd, listdir, makedirs, rename, remove
-from os.path import isfile, join, exists
+from os import cpu_count, getcwd, listdir, makedirs, rename, remove, replace, scandir, stat
+from os.path import abspath, basename, dirname, join, exists, splitext
 import re
+import sys
 from string import Formatter
+import threading
+from time import perf_counter, process_time, sleep
+import tracemalloc
+from urllib.parse import urljoin, urlsplit
 
 from csv import DictReader
-from natsort import natsorted
+from natsort import natsort_keygen
 from unidecode import unidecode
+try:
+	from PIL import Image, ImageOps  # Optional, used to optimize the images
+except ImportError:
+	Image = None
+try:
+	import brotli  # Optional, used to precompress the bundles
+except ImportError:
+	brotli = None
+try:
+	from resource import getrusage, RUSAGE_SELF  # Not available on Windows
+except ImportError:
+	getrusage = None
 
 __maintainer__ = "Bruno “Varstahl” Passeri"
 
@@ -25,11 +51,11 @@ class Arguments():
 	__parser = None
 	__args = None
 
-	def __init__(self, args, **kwargs):
+	def __init__(self, args, argv=None, **kwargs):
 		self.__parser = argparse.ArgumentParser(**kwargs)
 		for arg in args:
 			self.__parser.add_argument(*arg[0], **arg[1])
-		self.__args = self.__parser.parse_args()
+		self.__args = self.__parser.parse_args(argv)
 
 	def help(self):
 		self.__parser.print_help()
@@ -93,12 +119,122 @@ class CustomStringFormatter(str):
 		self._formatter._usedArgs = set()
 		return self._formatter.format(self, *args, **kwargs)
 
-def loadOptions():
+class Profiler():
+	""" Stage level profiling: wall time, CPU time, peak memory and item counts.
+	    `lap` closes the running stage, `call` and `iterate` accumulate the time spent in
+	    functions or generators as sub-stages. Does nothing until started.
+	"""
+	def __init__(self):
+		self.enabled = False
+		self.stages = {}
+		self.stats = None
+
+	def start(self, bStats=False):
+		self.enabled = True
+		self.stages = {}
+		self.stats = cProfile.Profile() if bStats else None
+		tracemalloc.start()
+		self._start = self._lap = (perf_counter(), process_time())
+
+	def record(self, name, wall, cpu, peak=None, count=None):
+		stage = self.stages.setdefault(name, {'wall': 0.0, 'cpu': 0.0, 'peak': None, 'count': None})
+		stage['wall'] += wall
+		stage['cpu'] += cpu
+		if peak is not None:
+			stage['peak'] = max(peak, stage['peak'] or 0)
+		if count is not None:
+			stage['count'] = (stage['count'] or 0) + count
+
+	def lap(self, name, count=None):
+		""" Records the time since the previous lap as the stage `name` """
+		if not self.enabled:
+			return
+		now = (perf_counter(), process_time())
+		peak = tracemalloc.get_traced_memory()[1]
+		tracemalloc.reset_peak()
+		self.record(name, now[0] - self._lap[0], now[1] - self._lap[1], peak, count)
+		self._lap = now
+
+	def call(self, name, f, *args, **kwargs):
+		""" Calls `f`, adding its time to the sub-stage `name` """
+		if not self.enabled:
+			return f(*args, **kwargs)
+		start = (perf_counter(), process_time())
+		try:
+			return f(*args, **kwargs)
+		finally:
+			self.record(name, perf_counter() - start[0], process_time() - start[1], count=1)
+
+	def iterate(self, name, iterable):
+		""" Yields from `iterable`, adding the time spent producing the items to the sub-stage
+		    `name`, which is also profiled through cProfile if enabled
+		"""
+		if not self.enabled:
+			yield from iterable
+			return
+		iterator = iter(iterable)
+		while True:
+			start = (perf_counter(), process_time())
+			if self.stats:
+				self.stats.enable()
+			try:
+				item = next(iterator)
+			except StopIteration:
+				return
+			finally:
+				if self.stats:
+					self.stats.disable()
+				self.record(name, perf_counter() - start[0], process_time() - start[1])
+			self.stages[name]['count'] = (self.stages[name]['count'] or 0) + 1
+			yield item
+
+	def report(self):
+		""" Prints the stages table and returns the machine-readable report """
+		total = (perf_counter() - self._start[0], process_time() - self._start[1])
+		print('{:<16}{:>10}{:>10}{:>12}{:>10}'.format('Stage', 'Wall (s)', 'CPU (s)', 'Peak (MB)', 'Items'))
+		# Sub-stages are listed after their parent
+		names = [x for x in self.stages if ': ' not in x]
+		names = [y for x in names for y in [x] + [z for z in self.stages if z.startswith(x + ': ')]]
+		names += [x for x in self.stages if x not in names]
+		for name, stage in [(x, self.stages[x]) for x in names] + [('total', {'wall': total[0], 'cpu': total[1], 'peak': None, 'count': None})]:
+			print('{:<16}{:>10.3f}{:>10.3f}{:>12}{:>10}'.format(
+				name, stage['wall'], stage['cpu'],
+				'' if stage['peak'] is None else '{:.1f}'.format(stage['peak'] / 1048576),
+				'' if stage['count'] is None else stage['count'],
+			))
+
+		# Ingest memory, normalized on the library size
+		parse = self.stages.get('parse', {})
+		perTenK = (parse['peak'] * 10000 / parse['count']) if parse.get('peak') and parse.get('count') else None
+		if perTenK:
+			print('Parse peak memory: {:.1f} MB per 10k games'.format(perTenK / 1048576))
+		return {
+			'stages': self.stages,
+			'total': {'wall': total[0], 'cpu': total[1]},
+			'parsePeakPer10k': perTenK,
+			'maxRSS': getrusage(RUSAGE_SELF).ru_maxrss if getrusage else None,  # KB on Linux, bytes on macOS
+		}
+
+	def save(self, fileName, statsFileName=None):
+		""" Prints the report, saving it as JSON and the cProfile stats if requested """
+		report = self.report()
+		try:
+			with open(fileName, 'w', encoding='utf-8') as f:
+				json.dump(report, f, indent='\t')
+			if self.stats and statsFileName:
+				self.stats.dump_stats(statsFileName)
+		except OSError:
+			print('Unable to write the profiling report to “{}”'.format(fileName))
+		tracemalloc.stop()
+		self.enabled = False
+profiler = Profiler()
+
+def loadOptions(fileName='options.json'):
 	# Try to load and parse the options file
 	o = {}
 	try:
-		if exists('options.json'):
-			with open('options.json', 'r', encoding='utf-8') as f:
+		if exists(fileName):
+			with open(fileName, 'r', encoding='utf-8') as f:
 				o = f.read(-1)
 			o = loadOptions.removeComments.sub('', o, re.DOTALL)
 			o = json.loads(o)
@@ -111,9 +247,230 @@ def loadOptions():
 			continue
 		o[k] = v
 
-	return o
+	return Options(o)
 loadOptions.removeComments = re.compile(r'\/\*.*?\*\/')
 
+class Options(dict):
+	""" User options, compiled once for hashed lookups: ignore sets, rename and sortAs
+	    dictionaries, customSort ranks and merge membership, matching both the titles as
+	    written and as escaped in the exported data. Ignore rules starting with `glob:` or
+	    `re:` are shell patterns or regular expressions, compiled into a single alternation.
+	    The build cost is kept in `cost` as (wall time, CPU time, entries) for the profiler.
+	"""
+	def __init__(self, o):
+		super().__init__(o)
+		start = (perf_counter(), process_time())
+		self.ignoredGames, self.ignoredGamesRx = self.ignoreRules(self['ignoreGames'], 'ignoreGames', True)
+		self.ignoredPlatforms, self.ignoredPlatformsRx = self.ignoreRules(self['ignorePlatforms'], 'ignorePlatforms')
+		self.renames = self.aliased(self['rename'])
+		self.sortAs = self.aliased(self['sortAs'])
+		self.customIndex = customSortIndex(self['customSort'])
+		for title in list(self.customIndex):
+			self.customIndex.setdefault(clean(title), self.customIndex[title])
+		self.mergeGroups = [[clean(x) for x in m] for m in self['merge']]  # Match string escaping
+		self.mergeTitles = {x for m in self.mergeGroups for x in m}
+		self.cost = (
+			perf_counter() - start[0], process_time() - start[1],
+			sum(len(self[k]) for k in ['ignorePlatforms', 'ignoreGames', 'rename', 'merge', 'sortAs', 'customSort']),
+		)
+
+	@staticmethod
+	def ignoreRules(rules, key, bTitles=False):
+		""" Set of the ignored names, and the list of compiled ignore patterns: a single alternation
+		    when possible. Invalid rules are reported and skipped.
+		"""
+		names = set()
+		patterns = []
+		for i, rule in enumerate(rules):
+			try:
+				if rule.startswith('glob:'):
+					patterns.append(re.compile('^' + translate(rule[5:])))
+				elif rule.startswith('re:'):
+					patterns.append(re.compile(rule[3:]))
+				else:
+					names.add(rule)
+					if bTitles:
+						names.add(clean(rule))
+			except (AttributeError, re.error) as e:
+				print('Skipping the invalid “{}” rule #{} {}: {}'.format(key, i + 1, json.dumps(rule, ensure_ascii=False), e if isinstance(e, re.error) else 'not a string'))
+		if 1 < len(patterns):
+			try:
+				patterns = [re.compile('|'.join('(?:{})'.format(x.pattern) for x in patterns))]
+			except re.error:
+				pass  # Global flags such as `(?i)` only work at the start, match the patterns one by one
+		return names, patterns
+
+	@staticmethod
+	def aliased(titles):
+		""" Title dictionary, also reachable through the escaped titles """
+		ret = dict(titles)
+		for title, value in titles.items():
+			ret.setdefault(clean(title), value)
+		return ret
+
+	def ignoredGame(self, title):
+		""" Whether the (escaped) title is ignored, the patterns match the title as written too """
+		if title in self.ignoredGames:
+			return True
+		return any(rx.search(title) or rx.search(unescape(title)) for rx in self.ignoredGamesRx)
+
+	def ignoredPlatform(self, platformName):
+		return (platformName in self.ignoredPlatforms) or any(rx.search(platformName) for rx in self.ignoredPlatformsRx)
+
+class Game():
+	""" Compact game record holding only the CSV columns used by the exporter, and the data
+	    derived from them. Supports the dictionary style access of the CSV rows it replaces.
+	"""
+	__slots__ = ('title', 'summary', 'platformList', 'developers', 'publishers', 'releaseDate', 'genres', 'themes', 'criticsScore',
+		'gameMins', 'dlcs', 'tags', '_defaultImage', '_defaultImagePaths', '_titleTL', '_searchable', '_coverImages', '_coverColor',
+		'_coverSource', '_atlasCell')
+	images = ['verticalCover', 'backgroundImage', 'squareIcon']  # Cover columns, by preference
+	lists = ['developers', 'dlcs', 'platformList', 'publishers', 'genres', 'themes', 'tags']
+
+	def __getitem__(self, key):
+		try:
+			return getattr(self, key)
+		except AttributeError:
+			raise KeyError(key) from None
+
+	def __setitem__(self, key, value):
+		setattr(self, key, value)
+
+	def __delitem__(self, key):
+		try:
+			delattr(self, key)
+		except AttributeError:
+			raise KeyError(key) from None
+
+	def __contains__(self, key):
+		return hasattr(self, key)
+
+	def get(self, key, default=None):
+		return getattr(self, key, default)
+
+def readGames(rows, args, options, titles):
+	""" Ingest stage: projects the CSV rows into `Game` records one at a time, skipping the
+	    games without images and the ignored ones, and dropping the ignored platforms.
+	    Repeated strings (platforms, developers, genres, …) are shared between the records.
+	"""
+	pool = {}
+	for row in rows:
+		# Set the default image
+		image = next((row[t] for t in Game.images if row[t]), None)
+		if image is None:
+			continue
+
+		# Clean, rename, transliterate the title and generate its search strings
+		data = profiler.call('parse: titles', titles, row['title'])
+		if data is None:
+			continue  # Ignored game
+
+		game = Game()
+		game.title, game._titleTL, game._searchable = data
+		game._defaultImage = image
+		game._defaultImagePaths = pathFromURL(image)
+		game.summary = row['summary']
+		game.gameMins = pool.setdefault(row['gameMins'], row['gameMins'])
+
+		# Clean up the rest of the data for usage
+		for k in Game.lists:
+			if args.pythonLists:
+				values = literal_eval(row[k]) if row[k] else []
+			else:
+				values = row[k].split(args.delimiter)
+			if 'platformList' == k:
+				values = [x for x in values if not options.ignoredPlatform(x)]
+			setattr(game, k, [pool.setdefault(x, x) for x in values])
+		game.releaseDate = clean(row['releaseDate'])
+		game.criticsScore = clean(row['criticsScore'])
+		yield game
+
+def mergeGames(games, merge, titles=None):
+	""" Merges the [2nd:N] games of each merge group into the first one.
+	    All the groups are applied in a single pass through a title → rows index, limited
+	    to the merged `titles` if known, and the absorbed rows are removed at the end.
+	    The titles in the groups must be escaped as in the games (see `Options`).
+	"""
+	index = {}
+	for i, game in enumerate(games):
+		if (titles is None) or (game['title'] in titles):
+			index.setdefault(game['title'], []).append(i)
+
+	absorbed = set()
+	for m in merge:
+		try:
+			minto = index[m[0]][0]
+		except KeyError:
+			continue
+		group = set(m)
+		mitems = [i for t in group if t in index for i in index[t] if i != minto]
+
+		# Merge in reverse order, as the previous implementation did
+		target = games[minto]
+		for item in sorted(mitems, reverse=True):
+			game = games[item]
+			for k in ['_searchable', 'developers', 'platformList', 'genres', 'themes']:
+				target[k] = list(dict.fromkeys(target[k] + game[k]))
+			if target['releaseDate'] > game['releaseDate']:
+				target['releaseDate'] = game['releaseDate']
+			try:    pt1 = int(target['gameMins'])
+			except: pt1 = 0
+			try:    pt2 = int(game['gameMins'])
+			except: pt2 = 0
+			target['gameMins'] = pt1 + pt2
+			absorbed.add(item)
+
+		# Absorbed rows can't be matched by the following groups
+		for t in group:
+			if t in index:
+				index[t] = [i for i in index[t] if i not in absorbed]
+				if not index[t]:
+					del index[t]
+
+	return [game for i, game in enumerate(games) if i not in absorbed] if absorbed else games
+
+class SortKey():
+	""" Precomputed sort key for a game: the natural sort key of the transliterated title,
+	    plus the customSort groups the title belongs to as a {group: rank} dictionary.
+	    Comparisons are equivalent to the old pairwise comparator, so the sort order
+	    doesn't change, but nothing is recomputed while sorting.
+	"""
+	__slots__ = ('title', 'natural', 'groups')
+	_natural = natsort_keygen()
+
+	def __init__(self, game, customIndex):
+		self.title = game['_titleTL']
+		self.natural = self._natural(self.title)
+		self.groups = customIndex.get(game['title'])
+
+	def __lt__(self, other):
+		# Custom sort: the first group containing both titles decides
+		if self.groups and other.groups:
+			common = self.groups.keys() & other.groups.keys()
+			if common:
+				group = min(common)
+				return self.groups[group] < other.groups[group]
+
+		# Natural sort, ties resolved in favour of the left element like `natsorted` did
+		if self.title == other.title:
+			return False
+		return self.natural <= other.natural
+
+def customSortIndex(customSort):
+	""" Builds a title → {group: rank} index of the customSort groups """
+	index = {}
+	for group, titles in enumerate(customSort):
+		for rank, title in enumerate(titles):
+			index.setdefault(title, {}).setdefault(group, rank)
+	return index
+
+def sortGames(games, customIndex):
+	""" Sorts the games by their natural transliterated title, or by the customSort order
+	    when the titles belong to the same group (see `customSortIndex`)
+	"""
+	return sorted(games, key=lambda game: SortKey(game, customIndex))
+
+@lru_cache(maxsize=4096)
 def roman_numeral(s):
 	""" Returns a roman numeral converted to an integer if valid, or the source string """
 	def roman_to_int(s):
@@ -121,10 +478,11 @@ def roman_numeral(s):
 		n = [d[i] for i in s if i in d]
 		return str(sum([i if i>=n[min(j+1, len(n)-1)] else -i for j,i in enumerate(n)]))
 
-	if not re.match(r'^(?=[mdclxvi])m*(c[md]|d?c{0,3})(x[cl]|l?x{0,3})(i[xv]|v?i{0,3})$', s):
+	if not roman_numeral.rx.match(s):
 		return s
 
 	return roman_to_int(s)
+roman_numeral.rx = re.compile(r'^(?=[mdclxvi])m*(c[md]|d?c{0,3})(x[cl]|l?x{0,3})(i[xv]|v?i{0,3})$')
 
 def repeatable_fields(mo):
 	""" Repeats '{rep}…{/rep}' template partial to format a list
@@ -153,45 +511,57 @@ def duration(t):
 	if d: t = str(d) + 'd ' + t
 	return t.strip()
 
-def clean(s, bPurge=True):
+def fixPunctuation(s):
+	""" Fixes the punctuation of the string, not memoized: used as is for the long texts """
 	s = s.strip()
-	for rx in clean.rx:
-		s = rx[0].sub(rx[1], s)
+	for c in fixPunctuation.characters:
+		s = s.replace(*c)
+	for rx in fixPunctuation.rx:
+		if rx[2] in s:
+			s = rx[0].sub(rx[1], s)
+	return s
+fixPunctuation.characters = [
+	('\u0092', '’'),  # PU2
+	('\u0093', '“'),  # STS
+	('\u0094', '”'),  # CCH
+]  # Plain replacements, much faster than `str.translate` on long non-ASCII strings
+fixPunctuation.rx = [
+	(re.compile(r'\.\.\.'), '…', '...'),
+	(re.compile(r'\s+-\s+'), ' – ', '-'),
+	(re.compile(r'\s*\u0097\s*'), ' – ', '\u0097'),  # CCH
+]  # (pattern, replacement, substring required to match)
+
+@lru_cache(maxsize=16384)
+def clean(s, bPurge=True):
+	""" Fixes the punctuation and escapes the short, often repeated strings (titles, dates, scores) """
+	s = fixPunctuation(s)
 	return escape(s) if bPurge else s
-clean.rx = [
-	(re.compile(r'\.\.\.'), '…'),
-	(re.compile(r'\s+-\s+'), ' – '),
-	(re.compile(r'\u0092'), '’'),  # PU2
-	(re.compile(r'\u0093'), '“'),  # STS
-	(re.compile(r'\u0094'), '”'),  # CCH
-	(re.compile(r'\s*\u0097\s*'), ' – '),  # CCH
-]
 
 def description(s):
+	""" Summary to HTML paragraphs and lists, not memoized as the summaries rarely repeat """
 	# Fix a bit of mess and split by line break
-	s = clean(s, False)
-	if (2 == description.quotes.subn('', s)[1]) and ('"' == s[0]) and ('"' == s[-1]):
+	s = fixPunctuation(s)
+	if (2 == s.count('"')) and ('"' == s[0]) and ('"' == s[-1]):
 		s = s[1:-1].strip()
 	s = s.replace('\\n', '\n')
-	s = description.paragraphs['replaceClosed'].sub('\n', s)
-	s = description.paragraphs['replaceOpen'].sub('\n', s)
-	s = description.paragraphs['clear'].sub(r'\n\1', s)
+	if '</p>' in s:
+		s = description.paragraphs['replaceClosed'].sub('\n', s)
+	if '<p' in s:
+		s = description.paragraphs['replaceOpen'].sub('\n', s)
+		s = description.paragraphs['clear'].sub(r'\n\1', s)
 	s = s.strip().split('\n')
 
 	# Analyse the strings by row
+	blanks = 0
 	for i in range(0, len(s)):
 		s[i] = s[i].strip()  # Trim whitespace
 
-		# Calculate the number of blank lines before the element and create a CSS class accordingly
-		breaks = 0
-		while True:
-			if (0 > (i-1-breaks)) or len(s[i-1-breaks]):
-				break
-			breaks += 1
-		breaks = 'spaced-{}'.format(max(0, min(1, breaks))) if (0 < breaks) and (0 < i) else ''
+		# Use the number of blank lines before the element to create a CSS class accordingly
+		breaks = 'spaced-{}'.format(max(0, min(1, blanks))) if (0 < blanks) and (0 < i) else ''
 
 		# Ignore empty paragraphs
 		if s[i]:
+			blanks = 0
 			if description.list.match(s[i]):
 				# Convert into a list instead of a string to prepare for the possibility
 				# of implementing sub-lists
@@ -200,27 +570,10 @@ def description(s):
 				# Transform the paragraph(?) tag
 				startTag = description.paragraphs['exists'].match(s[i])
 				if startTag:
-					startTag = description.parser.feed(startTag.group(1))
 					s[i] = description.paragraphs['exists'].sub('', s[i])
-				else:
-					startTag = [['p', ['class', []]]]
-
-				# Inject spacer class
-				if breaks:
-					try:
-						index = next(startTag[0].index(x) for x in startTag[0] if x[0] == 'class')
-						startTag[0][index][1].append(breaks)
-					except StopIteration:
-						startTag[0].append(['class', [breaks]])
-
-				# Reassemble the startTag
-				tag = startTag[0].pop(0)
-				for attr in startTag[0]:
-					if attr and attr[1]:
-						if list == type(attr[1]):
-							attr[1] = ' '.join(set(attr[1]))
-						tag += ' {0}={2}{1}{2}'.format(*attr, "'" if '"' in attr[1] else '"')
-				s[i] = '<' + tag + '>' + s[i] + '</p>'
+				s[i] = '<' + paragraphTag(startTag.group(1) if startTag else None, breaks) + '>' + s[i] + '</p>'
+		else:
+			blanks += 1
 
 	# Rebuild the description
 	ret = ''
@@ -241,8 +594,6 @@ def description(s):
 	if bInsideList:
 		ret += '</ul>'
 	return ret
-description.parser = AttributesParser()
-description.quotes = re.compile('"')
 description.list = re.compile(r'^[*•-]\s*')
 description.paragraphs = {
 	'open': re.compile(r'<p[^>]*>'),
@@ -251,6 +602,40 @@ description.paragraphs = {
 	'clear': re.compile(r'\s*(<p[^>]*>)\s*'),
 	'exists': re.compile(r'^\s*(<p[^>]*>)\s*'),
 }
+def summaryText(s):
+	""" Summary as plain text, without markup or entities: one paragraph or list item per line """
+	s = fixPunctuation(s)
+	if (2 == s.count('"')) and ('"' == s[0]) and ('"' == s[-1]):
+		s = s[1:-1].strip()
+	s = description.paragraphs['open'].sub('\n', description.paragraphs['replaceClosed'].sub('\n', s.replace('\\n', '\n')))
+	s = '\n'.join(' '.join(unescape(x).split()) for x in summaryText.tags.sub('', s).split('\n'))
+	return summaryText.blanks.sub('\n\n', s).strip()
+summaryText.tags = re.compile(r'<[^>]+>')
+summaryText.blanks = re.compile(r'\n{3,}')
+
+
+@lru_cache(maxsize=256)
+def paragraphTag(startTag, breaks):
+	""" Paragraph tag with the spacer class injected, from the source start tag if any """
+	startTag = paragraphTag.parser.feed(startTag) if startTag else [['p', ['class', []]]]
+
+	# Inject spacer class
+	if breaks:
+		try:
+			index = next(startTag[0].index(x) for x in startTag[0] if x[0] == 'class')
+			startTag[0][index][1].append(breaks)
+		except StopIteration:
+			startTag[0].append(['class', [breaks]])
+
+	# Reassemble the startTag
+	tag = startTag[0].pop(0)
+	for attr in startTag[0]:
+		if attr and attr[1]:
+			if list == type(attr[1]):
+				attr[1] = ' '.join(dict.fromkeys(attr[1]))  # Unique, in a stable order
+			tag += ' {0}={2}{1}{2}'.format(*attr, "'" if '"' in attr[1] else '"')
+	return tag
+paragraphTag.parser = AttributesParser()
 
 def delist(s):
 	""" Explodes a list into a nicely spaced list """
@@ -275,220 +660,1291 @@ def pathFromURL(imageURL):
 	return image
 pathFromURL.namefinder = re.compile(r'/([^/]+?)(?:\?([^/]+))?$')  # Compiled for better efficiency
 
+class ImageDownloader():
+	""" Concurrent image downloader: a bounded pool of worker threads, each one keeping
+	    its HTTP connections alive between requests, retrying with an exponential backoff
+	"""
+	retryStatus = {408, 425, 429, 500, 502, 503, 504}
+
+	def __init__(self, workers=8, retries=3, backoff=0.5, timeout=30):
+		self.workers = max(1, workers)
+		self.retries = retries
+		self.backoff = backoff
+		self.timeout = timeout
+		self._local = threading.local()
+
+	def download(self, items):
+		""" Downloads the (url, path) items, returns the number of downloaded images
+		    and the list of URLs that failed
+		"""
+		items = list(items)
+		queue = iter(items)
+		lock = threading.Lock()
+		downloaded = 0
+		failed = []
+
+		def worker():
+			nonlocal downloaded
+			while True:
+				with lock:
+					item = next(queue, None)
+				if item is None:
+					break
+				bOk = self.fetch(*item)
+				with lock:
+					if bOk:
+						downloaded += 1
+					else:
+						failed.append(item[0])
+			self.close()
+
+		threads = [threading.Thread(target=worker, daemon=True) for _ in range(min(self.workers, len(items)))]
+		for t in threads:
+			t.start()
+		for t in threads:
+			t.join()
+		return downloaded, failed
+
+	def connection(self, scheme, netloc):
+		""" Persistent per-thread connection to the host """
+		if not hasattr(self._local, 'connections'):
+			self._local.connections = {}
+		key = (scheme, netloc)
+		if key not in self._local.connections:
+			cls = http.client.HTTPSConnection if 'https' == scheme else http.client.HTTPConnection
+			self._local.connections[key] = cls(netloc, timeout=self.timeout)
+		return self._local.connections[key]
+
+	def close(self, key=None):
+		connections = getattr(self._local, 'connections', {})
+		for k in ([key] if key else list(connections)):
+			if k in connections:
+				connections.pop(k).close()
+
+	def fetch(self, url, path, redirects=5):
+		""" Downloads `url` into `path`, through a temporary file to never leave partial images """
+		for attempt in range(self.retries + 1):
+			if attempt:
+				sleep(self.backoff * (2 ** (attempt - 1)))
+			u = urlsplit(url)
+			key = (u.scheme, u.netloc)
+			try:
+				conn = self.connection(*key)
+				conn.request('GET', (u.path or '/') + ('?' + u.query if u.query else ''), headers={'User-Agent': 'GOG-Galaxy-HTML5-exporter'})
+				response = conn.getresponse()
+				data = response.read()
+			except (http.client.HTTPException, OSError):
+				self.close(key)  # Broken connection, reconnect on the next attempt
+				continue
+
+			if (300 <= response.status < 400) and response.getheader('Location') and redirects:
+				return self.fetch(urljoin(url, response.getheader('Location')), path, redirects - 1)
+			if 200 == response.status:
+				try:
+					with open(path + '.part', 'wb') as f:
+						f.write(data)
+					replace(path + '.part', path)
+					return True
+				except OSError:
+					return False
+			if response.status not in self.retryStatus:
+				return False
+		return False
+
+def removeFile(path, bDryRun=False):
+	""" Removes a file, or only reports it with `bDryRun`. Returns True on success """
+	if bDryRun:
+		print('Would remove “{}”'.format(path))
+		return True
+	try:
+		remove(path)
+		return True
+	except OSError:
+		return False
+
+def optimizeImage(job):
+	""" Resizes and transcodes a single image, returns True on success """
+	source, targets, fmt, quality = job
+	try:
+		with Image.open(source) as im:
+			im.load()
+			if fmt in ['JPEG'] and ('RGB' != im.mode):
+				im = im.convert('RGB')
+			elif im.mode not in ['RGB', 'RGBA']:
+				im = im.convert('RGBA' if 'transparency' in im.info or 'A' in im.mode else 'RGB')
+			for path, width in targets:
+				resized = im.copy()
+				resized.thumbnail((width, width * 3), Image.LANCZOS)  # Bound the width, never upscale
+				resized.save(path + '.part', fmt, quality=quality, optimize=True)
+				replace(path + '.part', path)
+		return True
+	except Exception:
+		return False
+
+def optimizeImages(games, width=342, fmt='webp', bImageSet=False, quality=80, images=None, bDryRun=False):
+	""" Image pipeline: creates the size-bounded derivatives of the covers in parallel,
+	    skipping the ones newer than their source, and removes the unused ones (see `removeFile`).
+	    Games get a `_coverImages` list of (path, pixel density) to be used in the CSS.
+	    `images` is the set of the existing images, if already known.
+	"""
+	if Image is None:
+		print('Unable to optimize the images, Pillow is not installed (`pip install Pillow`)')
+		return
+	Image.init()
+	if fmt.upper() not in Image.SAVE:
+		print('Unable to optimize the images, “{}” is not supported by the installed Pillow'.format(fmt))
+		return
+
+	try:
+		makedirs(optimizeImages.directory)
+	except: pass
+
+	with scandir(optimizeImages.directory) as entries:
+		derived = {'{}/{}'.format(optimizeImages.directory, x.name): x.stat().st_mtime for x in entries if x.is_file()}
+
+	densities = [1, 2] if bImageSet else [1]
+	jobs = {}
+	used = set()
+	for game in games:
+		source = coverSource(game)
+		if (source not in images) if images is not None else not exists(source):
+			if '_coverImages' in game:
+				del game['_coverImages']  # Left by a previous export of the same games
+			continue
+		name = basename(source)  # With its extension, `cover.jpg` and `cover.png` are different covers
+		game['_coverImages'] = [('{}/{}-{}.{}'.format(optimizeImages.directory, name, width * x, fmt), x) for x in densities]
+		used.update(x[0] for x in game['_coverImages'])
+		if source in jobs:
+			continue
+
+		# Skip the derivatives that are newer than their source
+		mtime = stat(source).st_mtime
+		targets = [(path, width * x) for path, x in game['_coverImages'] if derived.get(path, -1) < mtime]
+		if targets:
+			jobs[source] = (source, targets, fmt.upper(), quality)
+
+	failed = set()
+	if jobs:
+		with ProcessPoolExecutor() as pool:
+			for job, bOk in zip(jobs.values(), pool.map(optimizeImage, jobs.values(), chunksize=16)):
+				if not bOk:
+					failed.add(job[0])
+		print('Optimized {} image{}'.format(len(jobs) - len(failed), 's' if 1 != len(jobs) - len(failed) else ''))
+	if failed:
+		print('Failed to optimize {} image{}'.format(len(failed), 's' if 1 != len(failed) else ''))
+		for game in games:
+			if coverSource(game) in failed:
+				del game['_coverImages']
+
+	# Remove the derivatives that are no longer in use
+	for path in sorted(derived.keys() - used):
+		removeFile(path, bDryRun)
+optimizeImages.directory = 'images/optimized'
+
+def buildAtlas(job):
+	""" Packs the covers of an atlas sheet, cropped to the card aspect ratio and resized to the
+	    cell size, row by row. Returns True on success.
+	"""
+	path, sources, columns, cell, fmt, quality = job
+	try:
+		sheet = Image.new('RGB', (columns * cell[0], -(-len(sources) // columns) * cell[1]))
+		for i, source in enumerate(sources):
+			with Image.open(source) as im:
+				im.draft('RGB', cell)  # Fast JPEG decoding at a reduced size
+				sheet.paste(ImageOps.fit(im.convert('RGB'), cell, Image.LANCZOS), ((i % columns) * cell[0], (i // columns) * cell[1]))
+		sheet.save(path + '.part', fmt, quality=quality, optimize=True)
+		replace(path + '.part', path)
+		return True
+	except Exception:
+		return False
+
+def spriteAtlases(games, store, size=64, width=342, fmt='webp', quality=80, images=None, bDryRun=False):
+	""" Packs the distinct covers in atlas sheets of up to `size` covers, in page order, so that
+	    the page loads a few images instead of one per game. Sheets are named by the hash of their
+	    covers and only built when new, the unused ones are removed. Games get an `_atlasCell`
+	    (sheet path, column, row, columns, rows) to be used in the CSS.
+	    `images` is the set of the existing images, if already known.
+	"""
+	if Image is None:
+		print('Unable to create the sprite atlases, Pillow is not installed (`pip install Pillow`)')
+		return
+	Image.init()
+	if fmt.upper() not in Image.SAVE:
+		print('Unable to create the sprite atlases, “{}” is not supported by the installed Pillow'.format(fmt))
+		return
+
+	try:
+		makedirs(spriteAtlases.directory)
+	except: pass
+
+	# Distinct covers, in page order
+	covers = {}
+	for game in games:
+		if '_atlasCell' in game:
+			del game['_atlasCell']  # Left by a previous export of the same games
+		source = coverSource(game)
+		if (source in images) if images is not None else exists(source):
+			covers.setdefault(store.hash(source), source)
+
+	cell = (width, round(width * spriteAtlases.ratio))
+	columns = max(1, round(size ** .5))
+	digests = list(covers.keys())
+	cells = {}
+	jobs = []
+	used = set()
+	for n in range(0, len(digests), size):
+		members = digests[n:n + size]
+		key = sha1('{}:{}:{}:{}'.format(fmt, cell, columns, ','.join(members)).encode('utf-8')).hexdigest()[:12]
+		path = '{}/atlas-{}.{}'.format(spriteAtlases.directory, key, fmt)
+		rows = -(-len(members) // columns)
+		cells.update((x, (path, i % columns, i // columns, columns, rows)) for i, x in enumerate(members))
+		used.add(path)
+		if not exists(path):
+			jobs.append((path, [covers[x] for x in members], columns, cell, fmt.upper(), quality))
+
+	failed = set()
+	if jobs:
+		with ProcessPoolExecutor() as pool:
+			for job, bOk in zip(jobs, pool.map(buildAtlas, jobs)):
+				if not bOk:
+					failed.add(job[0])
+		print('Created {} sprite atlas{}'.format(len(jobs) - len(failed), 'es' if 1 != len(jobs) - len(failed) else ''))
+	if failed:
+		print('Failed to create {} sprite atlas{}'.format(len(failed), 'es' if 1 != len(failed) else ''))
+
+	for game in games:
+		source = coverSource(game)
+		if (source in images) if images is not None else exists(source):
+			atlas = cells[store.hash(source)]
+			if atlas[0] not in failed:
+				game['_atlasCell'] = atlas
+
+	# Remove the sheets that are no longer in use
+	with scandir(spriteAtlases.directory) as entries:
+		for x in entries:
+			path = '{}/{}'.format(spriteAtlases.directory, x.name)
+			if x.is_file() and (path not in used):
+				removeFile(path, bDryRun)
+spriteAtlases.directory = 'images/atlas'
+spriteAtlases.ratio = 482 / 342  # Cover aspect ratio
+
+def coverColor(path):
+	""" Dominant colour of an image as `#rrggbb`, or None on failure """
+	try:
+		with Image.open(path) as im:
+			im.draft('RGB', (64, 64))  # Fast JPEG decoding at a reduced size
+			im = im.convert('RGB')
+			im.thumbnail((32, 32))
+			quantized = im.quantize(4)
+			_, index = max(quantized.getcolors())
+			return '#{:02x}{:02x}{:02x}'.format(*quantized.getpalette()[index * 3:index * 3 + 3])
+	except Exception:
+		return None
+
+class ImageStore():
+	""" Content hashes of the images by modification time and size, and the placeholder colours """
+	fileName = 'images.cache.json'
+
+	def __init__(self):
+		self.files = {}  # {path: [modification time, size, hash]}
+		self.colors = {}  # {hash: #rrggbb}
+		self._used = {}
+		try:
+			with open(self.fileName, 'r', encoding='utf-8') as f:
+				data = json.load(f)
+			self.files = data['files']
+			self.colors = data['colors']
+		except (OSError, ValueError, KeyError, TypeError):
+			pass
+
+	def hash(self, path):
+		""" Content hash of the image """
+		if path not in self._used:
+			st = stat(path)
+			entry = self.files.get(path)
+			if not entry or (entry[0] != st.st_mtime_ns) or (entry[1] != st.st_size):
+				with open(path, 'rb') as f:
+					entry = [st.st_mtime_ns, st.st_size, sha1(f.read()).hexdigest()]
+			self._used[path] = entry
+		return self._used[path][2]
+
+	def save(self):
+		""" Writes the cache if it changed, keeping only the images hashed since it was loaded """
+		hashes = {x[2] for x in self._used.values()}
+		colors = {k: v for k, v in self.colors.items() if k in hashes}
+		if (self._used == self.files) and (colors == self.colors) and exists(self.fileName):
+			return
+		try:
+			with open(self.fileName, 'w', encoding='utf-8') as f:
+				json.dump({'files': self._used, 'colors': colors}, f, separators=(',', ':'))
+		except OSError:
+			print('Unable to write the image cache to “{}”'.format(self.fileName))
+
+def coverSource(game):
+	""" Local path of the cover, the first of its duplicates if any (see `dedupeImages`) """
+	return game.get('_coverSource') or game['_defaultImagePaths'][0]
+
+def dedupeImages(games, store, images=None):
+	""" Sets the `_coverSource` of the duplicate covers to the first of their paths, returns their count """
+	paths = {}
+	for game in games:
+		if '_coverSource' in game:
+			del game['_coverSource']  # Left by a previous export of the same games
+		source = game['_defaultImagePaths'][0]
+		if (source not in images) if images is not None else not exists(source):
+			continue
+		paths.setdefault(store.hash(source), set()).add(source)
+
+	first = {}
+	for group in paths.values():
+		if 1 < len(group):
+			canonical = min(group)
+			first.update((x, canonical) for x in group if x != canonical)
+	for game in games:
+		source = game['_defaultImagePaths'][0]
+		if source in first:
+			game['_coverSource'] = first[source]
+	return len(first)
+
+def coverPlaceholders(games, store, images=None):
+	""" Gives the games a `_coverColor`, the dominant colour of their cover shown while it loads.
+	    Only the images never seen before by the `store` are decoded, in parallel.
+	    `images` is the set of the existing images, if already known.
+	"""
+	if Image is None:
+		print('Unable to compute the cover placeholders, Pillow is not installed (`pip install Pillow`)')
+		return
+
+	jobs = {}
+	for game in games:
+		if '_coverColor' in game:
+			del game['_coverColor']  # Left by a previous export of the same games
+		source = coverSource(game)
+		if (source not in images) if images is not None else not exists(source):
+			continue
+		digest = store.hash(source)
+		if digest not in store.colors:
+			jobs.setdefault(digest, source)
+	if jobs:
+		with ProcessPoolExecutor() as pool:
+			for digest, color in zip(jobs.keys(), pool.map(coverColor, jobs.values(), chunksize=16)):
+				if color:
+					store.colors[digest] = color
+
+	for game in games:
+		source = coverSource(game)
+		if (source not in images) if images is not None else not exists(source):
+			continue
+		color = store.colors.get(store.hash(source))
+		if color:
+			game['_coverColor'] = color
+
+def imageSnapshot(directory='images'):
+	""" Set of the image paths in `directory`, from a single directory scan """
+	try:
+		with scandir(directory) as entries:
+			return {'{}/{}'.format(directory, x.name) for x in entries if ('.keep' != x.name) and x.is_file()}
+	except FileNotFoundError:
+		return set()
+
+def platformIcon(platformName):
+	""" Icon name of a platform, from its full name """
+	return platformIcon.names.get(platformName, 'generic')
+
 def platformIcons(platformNames, bIconName=False):
-	""" Tag placeholders for SVG symbols generator """
+	""" Inline SVG icons, using the view box and aspect ratio of the sprite symbols they reference.
+	    Icons without a symbol use the generic one.
+	"""
 	icons = ''
 	for platformName in platformNames:
-		if platformName in options['ignorePlatforms']:
+		if options.ignoredPlatform(platformName):
 			continue
-		if bIconName:
-			iconName = platformName
-		else:
-			iconName = 'generic'
-			try:
-				iconName = next(x for x in platformIcons.short if platformIcons.short[x]==platformName)
-			except StopIteration: pass
-		icons += '<i class="pi pi-{}"></i>'.format(iconName if iconName in platformIcons.icons else 'generic pi-{}'.format(iconName))
+		iconName = platformName if bIconName else platformIcon(platformName)
+		symbol = iconName if iconName in platformIcons.symbols else 'generic'
+		attributes = platformIcons.symbols.get(symbol, {})
+		icons += '<svg class="platforms pi-{}"{}><use xlink:href="#icon-platform-{}" /></svg>'.format(
+			iconName if symbol == iconName else 'generic pi-{}'.format(iconName),
+			''.join(' {}="{}"'.format(x, attributes[x]) for x in ['preserveAspectRatio', 'viewBox'] if x in attributes),
+			symbol,
+		)
 	return icons
-platformIcons.icons = ['apple-arcade', 'battlenet', 'bethesda', 'discord', 'epic', 'ffxiv', 'gamecube', 'generic', 'gog', 'gw2', 'humble', 'itch', 'minecraft', 'nintendo-switch', 'nintendo', 'origin', 'paradox', 'pathofexile', 'playstation2', 'psn', 'rockstar', 'steam', 'twitch', 'uplay', 'wargaming', 'xboxone']
+platformIcons.symbols = {}  # {icon name: {attribute: value}}, see `spriteSymbols`
 platformIcons.short = {"3do": "3DO Interactive Multiplayer", "3ds": "Nintendo 3DS", "aion": "Aion", "aionl": "Aion: Legions of War", "amazon": "Amazon", "amiga": "Amiga", "arc": "ARC", "atari": "Atari 2600", "battlenet": "Battle.net", "bb": "BestBuy", "beamdog": "Beamdog", "bethesda": "Bethesda.net", "blade": "Blade & Soul", "c64": "Commodore 64", "d2d": "Direct2Drive", "dc": "Dreamcast", "discord": "Discord", "dotemu": "DotEmu", "egg": "Newegg", "elites": "Elite Dangerous", "epic": "Epic Games Store", "eso": "The Elder Scrolls Online", "fanatical": "Fanatical", "ffxi": "Final Fantasy XI", "ffxiv": "Final Fantasy XIV", "fxstore": "Placeholder", "gamehouse": "GameHouse", "gamesessions": "GameSessions", "gameuk": "GAME UK", "generic": "Other", "gg": "GamersGate", "glyph": "Trion World", "gmg": "Green Man Gaming", "gog": "GOG", "gw": "Guild Wars", "gw2": "Guild Wars 2", "humble": "Humble Bundle", "indiegala": "IndieGala", "itch": "Itch.io", "jaguar": "Atari Jaguar", "kartridge": "Kartridge", "lin2": "Lineage 2", "minecraft": "Minecraft", "n64": "Nintendo 64", "ncube": "Nintendo GameCube", "nds": "Nintendo DS", "neo": "NeoGeo", "nes": "Nintendo Entertainment System", "ngameboy": "Game Boy", "nswitch": "Nintendo Switch", "nuuvem": "Nuuvem", "nwii": "Wii", "nwiiu": "Wii U", "oculus": "Oculus", "origin": "Origin", "paradox": "Paradox Plaza", "pathofexile": "Path of Exile", "pce": "PC Engine", "playasia": "Play-Asia", "playfire": "Playfire", "ps2": "PlayStation 2", "psn": "PlayStation Network", "psp": "PlayStation Portable", "psvita": "PlayStation Vita", "psx": "PlayStation", "riot": "Riot", "rockstar": "Rockstar Games Launcher", "saturn": "Sega Saturn", "sega32": "32X", "segacd": "Sega CD", "segag": "Sega Genesis", "sms": "Sega Master System", "snes": "Super Nintendo Entertainment System", "stadia": "Google Stadia", "star": "Star Citizen", "steam": "Steam", "test": "Test", "totalwar": "Total War", "twitch": "Twitch", "unknown": "Unknown", "uplay": "Uplay", "vision": "ColecoVision", "wargaming": "Wargaming", "weplay": "WePlay", "winstore": "Windows Store", "xboxog": "Xbox", "xboxone": "Xbox Live", "zx": "ZX Spectrum PC"}
+platformIcon.names = {v: k for k, v in reversed(platformIcons.short.items())}  # Full name → icon name, the first one wins
 
-def Main(args, options):
-	games = []
-	articles = '(' + '|'.join([
-		r'an?\s+', r'the\s+',  # English
-		r'il?\s+', r'l[oiae]\s+', r'gli\s+', r'un[oa]?\s+', r'(?:l|un)\''  # Italian
-	]) + ')'
-	titleReplaceList = [
-		(r'\.\.\.', '…'),
-	]  # Cleans the title
-	transliteratedTitleReplaceList = [
-		(r', ' + articles + r'$', ''),
-		(r'\(tm\)', ''),
-		(r'\(r\)', ''),
-	]  # Cleans the transliterated title, and removes useless things
-	searchReplaceList = [
-		[
-			(r'[,.…]', ''),
-		], [
-			(r'[;:\'-]', ''),
-			(r'[|\\/()]', ' '),
-			(r'\s{2,}', ' '),
-		], [
-			(r'([0-9])0{12}(\s|$)', r'\1t\2'),
-			(r'([0-9])0{9}(\s|$)', r'\1g\2'),
-			(r'([0-9])0{6}(\s|$)', r'\1m\2'),
-			(r'([0-9])0{3}(\s|$)', r'\1k\2'),
-		]
-	]  # Each list group creates a new permutation of the search string
-
-	# Build the game data list
-	with open(args.fileCSV, 'r', encoding='utf-8', newline='') as csvfile:
-		for row in DictReader(csvfile, delimiter=args.delimiter):
-			try:
-				# Set the default image
-				for t in ['verticalCover', 'backgroundImage', 'squareIcon']:
-					if row[t]:
-						row['_defaultImage'] = row[t]
-						break
-			except KeyError:
-				print('Unable to find images: forgot to select a delimiter or to export them?')
-				return
+@lru_cache(maxsize=4)
+def spriteSymbols(svg):
+	""" {icon name: {attribute: value}} of the platform symbols in the SVG sprite, memoized:
+	    the result is shared and must not be modified
+	"""
+	symbols = {}
+	for mo in spriteSymbols.symbol.finditer(svg):
+		attributes = dict(spriteSymbols.attribute.findall(mo.group(1)))
+		if attributes.get('id', '').startswith('icon-platform-'):
+			symbols[attributes['id'][len('icon-platform-'):]] = attributes
+	return symbols
+spriteSymbols.symbol = re.compile(r'<symbol\b([^>]*)>')
+spriteSymbols.attribute = re.compile(r'([\w:-]+)="([^"]*)"')
+
+def pruneSprite(svg, iconNames):
+	""" Removes the platform symbols not listed in `iconNames` from the SVG sprite """
+	return pruneSprite.symbol.sub(lambda mo: mo.group(0) if mo.group(1) in iconNames else '', svg)
+pruneSprite.symbol = re.compile(r'\s*<symbol\b[^>]*\bid="icon-platform-([^"]+)"[^>]*>.*?</symbol>', re.DOTALL)
+
+def exportedGames(games, debugEntryID=False):
+	""" Yields the (id, game) pairs to export """
+	gameID = len(games)  # start the ids from N (games count), to allow re-ordering in the range [0:N-1]
+	gameID = (gameID + 1000 - (gameID % 1000))  # Round it up to the thousands
+	for game in games:
+		gameID += 1
+		if debugEntryID and (gameID not in debugEntryID):
+			continue
+		yield gameID, game
+
+class GameTemplate():
+	""" Game card template compiled once into a format string of positional slots: the known
+	    fields, the literal text and the `{rep}…{/rep}` blocks are resolved up front, so that
+	    rendering a card is a single `format` call. Renders exactly like formatting the
+	    template with `CustomStringFormatter` and then replacing the repeatable fields, which
+	    is still used for the templates that can't be compiled (i.e. nested format specs).
+	"""
+	repeat = re.compile(r'(\s*){rep}(.*?){/rep}')
+	fieldName = re.compile(r'[^.[]*')
+
+	def __init__(self, source, fields, hidden=()):
+		self.source = CustomStringFormatter(source)
+		self.hidden = hidden
+		self.repeats = []  # (whitespace, partial) of each repeatable block
+		self.slots = []  # Field names, or indexes of the repeatable blocks
+		self.compiled = None
+		try:
+			pieces, used = self.parse(fields)
+		except ValueError:
+			pieces, used = None, set()
+		self.listed = [x for x in fields if (x not in used) and (x not in hidden)]
+		if pieces is not None:
+			self.compiled = self.compile(pieces)
+		self.fields = [x for x in fields if (x in used) or (x in self.listed)] if self.compiled is not None else list(fields)
+
+	def parse(self, fields):
+		""" Splits the template into literal strings and (slot format, name) fields, resolving
+		    the positional and missing fields to literals. Returns None for unsupported templates.
+		"""
+		pieces = []
+		used = set()
+		auto = 0
+		bManual = False
+		for literal, name, spec, conversion in Formatter().parse(self.source):
+			if literal:
+				pieces.append(literal)
+			if name is None:
+				continue
+			first = self.fieldName.match(name).group(0)
+			rest = name[len(first):]
+			if '' == first:
+				first = auto
+				auto += 1
+			elif first.isdigit():
+				first = int(first)
+				bManual = True
+			if auto and bManual:
+				return None, used  # Mixed numbering
+			bExists = (0 == first) if isinstance(first, int) else (first in fields)
+			if bExists:
+				used.add(first)
+			if not rest and not conversion and not spec:
+				if not bExists:
+					pieces.append('{{{0}}}'.format(first))
+				elif isinstance(first, int):
+					pieces.append('a')
+				else:
+					pieces.append(('', first))
+			elif bExists and isinstance(first, str) and ('{' not in spec):
+				pieces.append((rest + ('!' + conversion if conversion else '') + (':' + spec if spec else ''), first))
+			else:
+				return None, used
+		return pieces, used
 
-			if '_defaultImage' not in row:
+	def compile(self, pieces):
+		""" Joins the pieces into the positional format string, None if a repeatable block
+		    isn't fully contained in the literal text
+		"""
+		compiled = ''
+		i = 0
+		while i < len(pieces):
+			if not isinstance(pieces[i], str):
+				compiled += '{{{}{}}}'.format(len(self.slots), pieces[i][0])
+				self.slots.append(pieces[i][1])
+				i += 1
 				continue
-			row['_defaultImagePaths'] = pathFromURL(row['_defaultImage'])
 
-			# Fix common problems with titles
-			for i in titleReplaceList:
-				row['title'] = clean(re.sub(i[0], i[1], row['title']))
+			literal = ''
+			bFollowsField = 0 < i
+			while (i < len(pieces)) and isinstance(pieces[i], str):
+				literal += pieces[i]
+				i += 1
+			start = 0
+			for mo in self.repeat.finditer(literal):
+				if bFollowsField and (0 == mo.start()):
+					return None  # The leading whitespace could belong to the field
+				compiled += literal[start:mo.start()].replace('{', '{{').replace('}', '}}')
+				compiled += '{{{}}}'.format(len(self.slots))
+				self.slots.append(len(self.repeats))
+				self.repeats.append((mo.group(1), mo.group(2)))
+				start = mo.end()
+			if '{rep}' in literal[start:]:
+				return None
+			compiled += literal[start:].replace('{', '{{').replace('}', '}}')
+		return compiled
+
+	def render(self, params):
+		if self.compiled is None:
+			html = self.source.format('a', **params)
+			used = self.source.used_keys()
+			repeatable_fields.params = {x:params[x] for x in params if x not in used and x not in self.hidden and isinstance(x, str)}
+			return self.repeat.sub(repeatable_fields, html)
+
+		listed = [(x, params[x]) for x in self.listed if params[x]]
+		return self.compiled.format(*[params[x] if isinstance(x, str) else ''.join(
+			self.repeats[x][0] + self.repeats[x][1].format(*y) for y in listed
+		) for x in self.slots])
+
+def renderGame(gameID, game, template):
+	""" Single game HTML, computing only the fields used by the compiled `GameTemplate` """
+	return template.render({x: renderGame.fields[x](gameID, game) for x in template.fields})
+renderGame.fields = {
+	'id': lambda gameID, game: gameID,
+	'title': lambda gameID, game: game['title'],
+	'description': lambda gameID, game: description(game['summary']),
+	'dlcs': lambda gameID, game: delist(game['dlcs']),
+	'search': lambda gameID, game: json.dumps(game['_searchable']).replace("'", "&apos;"),
+	'developers': lambda gameID, game: delist(game['developers']),
+	'platforms': lambda gameID, game: platformIcons(game['platformList']),
+	'score': lambda gameID, game: game['criticsScore'],
+	'publishers': lambda gameID, game: delist(game['publishers']),
+	'released': lambda gameID, game: game['releaseDate'],
+	'genres': lambda gameID, game: delist(game['genres']),
+	'themes': lambda gameID, game: delist(game['themes']),
+	'playtime': lambda gameID, game: duration(game['gameMins']),
+}
+renderGame.hidden = ['search']  # Parameters that are never listed in the repeatable fields
+
+def initRenderer(template, o, symbols):
+	""" Process pool initializer: workers need the game template, the user options and the icons """
+	global options
+	options = o
+	renderChunk.template = template
+	platformIcons.symbols = symbols
+
+def renderChunk(chunk):
+	""" Renders a list of (id, game) pairs inside a worker process """
+	return [renderGame(*x, renderChunk.template) for x in chunk]
+
+def renderGames(games, template, jobs=1, debugEntryID=False, cache=None):
+	""" Yields the rendered game cards in order, spreading the work across `jobs` processes.
+	    With a cache only the new or changed cards are rendered, the rest is spliced in.
+	"""
+	def render(pairs):
+		if jobs < 2:
+			for x in pairs:
+				yield renderGame(*x, template)
+			return
 
-			# Skip or rename according to the user options
-			if row['title'] in options['ignoreGames']:
-				continue
-			if row['title'] in options['rename']:
-				row['title'] = options['rename'][row['title']]
+		# Only a window of chunks is submitted ahead, to keep the memory flat at the writer's pace
+		chunks = iter(lambda: list(islice(pairs, renderGames.chunkSize)), [])
+		with ProcessPoolExecutor(jobs, initializer=initRenderer, initargs=(template, options, platformIcons.symbols)) as pool:
+			window = deque(pool.submit(renderChunk, x) for x in islice(chunks, renderGames.window * jobs))
+			while window:
+				cards = window.popleft().result()
+				for x in islice(chunks, 1):
+					window.append(pool.submit(renderChunk, x))
+				yield from cards
+
+	pairs = exportedGames(games, debugEntryID)
+	if cache is None:
+		yield from render(pairs)
+		return
+
+	# Cards are cached with a placeholder ID, as the IDs depend on the position in the list
+	pairs = [(gameID, game, cache.cardKey(game)) for gameID, game in pairs]
+	cached = [cache.card(key) for _, _, key in pairs]
+	rendered = render(iter([(RenderCache.idMarker, game) for (_, game, _), html in zip(pairs, cached) if html is None]))
+	for (gameID, game, key), html in zip(pairs, cached):
+		if html is None:
+			html = cache.storeCard(key, next(rendered))
+		yield html.replace(RenderCache.idMarker, str(gameID))
+renderGames.chunkSize = 250
+renderGames.window = 2  # Chunks submitted ahead, per process
+
+def gameCSS(gameID, game, bLazy=False):
+	""" Single game CSS rule, pointing to the atlas cell or the optimized images if available. Lazy covers only
+	    apply to the cards with the `cover` class, added by the client near the viewport, and
+	    show the dominant colour of the cover meanwhile.
+	"""
+	images = game.get('_coverImages')
+	atlas = game.get('_atlasCell')
+	if atlas:
+		path, column, row, columns, rows = atlas
+		rule = 'background-image:url("{}");background-size:{}% {}%;background-position:{}% {}%;'.format(
+			path, 100 * columns, 100 * rows, gameCSS.percent(column, columns), gameCSS.percent(row, rows))
+	elif not images:
+		rule = 'background-image:url("{}");'.format(coverSource(game))
+	else:
+		rule = 'background-image:url("{}");'.format(images[0][0])
+		if 1 < len(images):
+			rule += 'background-image:image-set({});'.format(', '.join('url("{}") {}x'.format(*x) for x in images))
+	if not bLazy:
+		return '#game-{0}{{order:{0};{1}}}'.format(gameID, rule)
+	color = game.get('_coverColor')
+	return '#game-{0}{{order:{0};{2}}}#game-{0}.cover{{{1}}}'.format(gameID, rule, ('background-color:' + color + ';') if color else '')
+gameCSS.percent = lambda i, n: '{:g}'.format(round(100 * i / (n - 1), 4)) if 1 < n else '0'  # Background position of the i-th of n cells
+
+def searchIndex(games, debugEntryID=False):
+	""" Compact search index for the client: the search strings of each game in page order,
+	    and a trigram → game positions map, with the positions delta-encoded in base 36
+	"""
+	def base36(n):
+		digits = ''
+		while True:
+			n, d = divmod(n, 36)
+			digits = '0123456789abcdefghijklmnopqrstuvwxyz'[d] + digits
+			if not n:
+				return digits
+
+	strings = []
+	grams = {}
+	for i, (_, game) in enumerate(exportedGames(games, debugEntryID)):
+		strings.append('\n'.join(game['_searchable']))
+		for source in game['_searchable']:
+			for j in range(len(source) - 2):
+				positions = grams.setdefault(source[j:j+3], [])
+				if not positions or (positions[-1] != i):
+					positions.append(i)
+
+	for gram, positions in grams.items():
+		grams[gram] = ','.join(base36(b - a) for a, b in zip([0] + positions, positions))
+	return json.dumps({'strings': strings, 'grams': grams}, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+
+def gameRecord(gameID, game):
+	""" Machine-readable record of a processed game, with a stable schema of plain unescaped
+	    strings (see the README)
+	"""
+	def number(s):
+		try:
+			n = float(s)
+			return int(n) if n.is_integer() else n
+		except (TypeError, ValueError):
+			return None
+
+	def values(l):
+		return [x for x in l if x]  # Empty CSV fields are split into ['']
+
+	atlas = game.get('_atlasCell')
+	return {
+		'id': gameID,
+		'title': unescape(game['title']),
+		'sortTitle': unescape(game['_titleTL']),
+		'search': list(dict.fromkeys(plainSearch(x) for x in values(game['_searchable']))),
+		'summary': summaryText(game['summary']),
+		'platforms': values(game['platformList']),
+		'developers': values(game['developers']),
+		'publishers': values(game['publishers']),
+		'genres': values(game['genres']),
+		'themes': values(game['themes']),
+		'dlcs': values(game['dlcs']),
+		'tags': values(game['tags']),
+		'releaseDate': unescape(game['releaseDate']),
+		'criticsScore': number(game['criticsScore']),
+		'playtime': number(game['gameMins']) or 0,
+		'image': {
+			'url': game['_defaultImage'],
+			'path': coverSource(game),
+			'optimized': [list(x) for x in game.get('_coverImages') or []],
+			'atlas': dict(zip(['path', 'column', 'row', 'columns', 'rows'], atlas)) if atlas else None,
+			'color': game.get('_coverColor'),
+		},
+	}
+
+def plainSearch(s):
+	""" Unescapes a search string, including the entities whose `;` the search permutations removed """
+	return plainSearch.entities.sub(lambda m: plainSearch.characters[m.group(1)], s)
+plainSearch.entities = re.compile(r'&(amp|lt|gt|quot|#x27);?')  # The ones `escape` writes
+plainSearch.characters = {'amp': '&', 'lt': '<', 'gt': '>', 'quot': '"', '#x27': "'"}
+
+def gameRecords(games, debugEntryID=False):
+	""" Yields the records of the games to export, one at a time """
+	for gameID, game in exportedGames(games, debugEntryID):
+		yield gameRecord(gameID, game)
+
+def writeRecords(f, games, bLines=False, debugEntryID=False):
+	""" Streams the game records to the file-like object `f`, as a JSON array or as NDJSON.
+	    Returns the number of records written.
+	"""
+	count = 0
+	for record in gameRecords(games, debugEntryID):
+		data = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+		f.write((data + '\n') if bLines else ((',\n' if count else '[\n') + data))
+		count += 1
+	if not bLines:
+		f.write('\n]\n' if count else '[]\n')
+	return count
+
+def writeShards(games, args, templates, cache=None):
+	""" Writes the rendered cards in JS shards of `args.shards` cards next to the HTML file,
+	    for the client to load and render only the visible ones. Returns the shards list.
+	    With `args.bundle` the shards have content-hashed names, and are only written if new.
+	"""
+	directory = shardsDirectory(args.fileHTML)
+	try:
+		makedirs(directory)
+	except: pass
+
+	def write(n, cards):
+		data = 'gameShard({},{});'.format(n, json.dumps(cards, ensure_ascii=False, separators=(',', ':'))).encode('utf-8')
+		name = 'cards-{}.{}.js'.format(n, sha1(data).hexdigest()[:12]) if args.bundle else 'cards-{}.js'.format(n)
+		if not (args.bundle and exists(join(directory, name))):
+			with open(join(directory, name), 'wb') as f:
+				f.write(data)
+		names.add(name)
+		return '{}/{}'.format(basename(directory), name)
+
+	files = []
+	names = set()
+	count = 0
+	cards = []
+	for card in profiler.iterate('html: render', renderGames(games, templates['game'], args.jobs, args.debugEntryID, cache)):
+		cards.append(card.strip())
+		count += 1
+		if args.shards == len(cards):
+			files.append(write(len(files), cards))
+			cards = []
+	if cards:
+		files.append(write(len(files), cards))
+
+	# Remove the shards of previous exports, and their compressed copies unless bundling
+	for f in listdir(directory):
+		m = writeShards.shardName.match(f)
+		if m and ((m.group(1) not in names) or (m.group(2) and not args.bundle)):
+			removeFile(join(directory, f), args.dryRun)
+
+	return json.dumps({'count': count, 'size': args.shards, 'files': files}, separators=(',', ':')).replace('</', '<\\/')
+writeShards.shardName = re.compile(r'^(cards-\d+(?:\.[0-9a-f]+)?\.js)(\.gz|\.br)?$')
+
+def shardsDirectory(fileHTML):
+	return splitext(fileHTML)[0] + '.cards'
+
+def bundleAsset(fileName, directory, bDryRun=False):
+	""" Copies a CSS or JS asset next to the HTML file with a content-hashed name, removing
+	    its previous versions. Returns the name to link it with.
+	"""
+	with open(fileName, 'r', encoding='utf-8') as f:
+		data = f.read(-1)
+	if '.css' == splitext(fileName)[1]:
+		data = bundleFonts(data, fileName, directory, bDryRun)
+	return bundleFile(data.encode('utf-8'), fileName, directory, bDryRun)
+
+def bundleFile(data, fileName, directory, bDryRun=False):
+	""" Writes the data in `directory` as a content-hashed version of `fileName`, unless it
+	    already exists, and removes its previous versions. Returns the hashed name.
+	"""
+	name, ext = splitext(basename(fileName))
+	hashed = '{}.{}{}'.format(name, sha1(data).hexdigest()[:12], ext)
+	if not exists(join(directory, hashed)):
+		with open(join(directory, hashed), 'wb') as f:
+			f.write(data)
+
+	# Remove the previous versions
+	previous = re.compile(r'^{}\.[0-9a-f]{{12}}{}(\.gz|\.br)?$'.format(re.escape(name), re.escape(ext)))
+	for f in listdir(directory or '.'):
+		if previous.match(f) and not f.startswith(hashed):
+			removeFile(join(directory, f), bDryRun)
+	return hashed
+
+def bundleFonts(css, fileName, directory, bDryRun=False):
+	""" Copies the fonts linked by the CSS file in `directory` with content-hashed names, and
+	    links them from there. Fonts are not precompressed, WOFF2 already is.
+	"""
+	def font(m):
+		try:
+			with open(join(dirname(fileName), m.group(1)), 'rb') as f:
+				return 'url({})'.format(bundleFile(f.read(), m.group(1), directory, bDryRun))
+		except OSError:
+			return m.group(0)
+	return bundleFonts.url.sub(font, css)
+bundleFonts.url = re.compile(r'url\((\.\./assets/fonts/[^)]+)\)')
+
+def compressFile(job):
+	""" Writes the precompressed siblings of a file, in the given encodings """
+	path, encodings = job
+	try:
+		with open(path, 'rb') as f:
+			data = f.read()
+		for encoding in encodings:
+			if '.gz' == encoding:
+				compressed = gzip.compress(data, 9, mtime=0)
+			else:
+				compressed = brotli.compress(data, quality=11)
+			with open(path + encoding + '.part', 'wb') as f:
+				f.write(compressed)
+			replace(path + encoding + '.part', path + encoding)
+		return True
+	except Exception:
+		return False
 
-			# Transliterate and transform the title in a sortable/searchable ascii format
-			if row['title'] in options['sortAs']:
-				# Custom sort name according to the user options
-				row['_titleTL'] = options['sortAs'][row['title']]
+def compressBundle(paths):
+	""" Precompresses the bundle files in parallel, skipping the ones whose compressed
+	    siblings are newer than them. Returns the number of files compressed.
+	"""
+	encodings = ['.gz'] + (['.br'] if brotli else [])
+	jobs = []
+	for path in paths:
+		mtime = stat(path).st_mtime
+		missing = [x for x in encodings if not exists(path + x) or (stat(path + x).st_mtime < mtime)]
+		if missing:
+			jobs.append((path, missing))
+
+	if not jobs:
+		return 0
+	with ProcessPoolExecutor() as pool:
+		compressed = sum(pool.map(compressFile, jobs))
+	print('Compressed {} file{}{}'.format(compressed, 's' if 1 != compressed else '', '' if brotli else ' (gzip only, Brotli is not installed: `pip install brotli`)'))
+	if compressed < len(jobs):
+		print('Failed to compress {} file{}'.format(len(jobs) - compressed, 's' if 1 != len(jobs) - compressed else ''))
+	return compressed
+
+def writeHTML(f, games, args, templates, debug_html='', cache=None):
+	""" Streams the HTML5 page to the file-like object `f`: the index template is split
+	    at its `{imageCSS}`, `{content}`, `{searchIndex}` and `{shards}` placeholders, and the
+	    games CSS and cards are written one at a time, so the whole page never sits in memory.
+	    The search index and shards elements are added before the script if the template lacks them.
+	    With `args.shards` the cards are written in separate files, see `writeShards`.
+	"""
+	css = ('<style>' + templates['style'] + '</style>') if args.embed else ('<link rel="stylesheet" type="text/css" href="' + templates['style'] + '">')
+	js = ('<script>' + templates['script'] + '</script>') if args.embed else ('<script src="' + templates['script'] + '"></script>')
+
+	# Custom index templates predating the client data placeholders get them before the script
+	fields = {x[1] for x in Formatter().parse(templates['index']) if x[1]}
+	for field, element in writeHTML.dataElements.items():
+		if field not in fields:
+			js = element.format(writeHTML.marker.format(field)) + js
+	page = templates['index'].format(**{
+		'language': 'en',
+		'title': args.title,
+		'imageCSS': writeHTML.marker.format('imageCSS'),
+		'style': css,
+		'javascript': js,
+		'content': writeHTML.marker.format('content'),
+		'searchIndex': writeHTML.marker.format('searchIndex'),
+		'shards': writeHTML.marker.format('shards'),
+		'platformIcons': templates['platforms'],
+		'debug': debug_html,
+	})
+
+	streams = {
+		'imageCSS': lambda: () if args.debugEntryID else chain(['#games{--lazy-covers:1;}'] if args.lazyImages else [],
+			(gameCSS(*x, args.lazyImages) for x in exportedGames(games, args.debugEntryID))),
+		'content': lambda: () if args.shards else profiler.iterate('html: render', renderGames(games, templates['game'], args.jobs, args.debugEntryID, cache)),
+		'searchIndex': lambda: [searchIndex(games, args.debugEntryID)],
+		'shards': lambda: [writeShards(games, args, templates, cache)] if args.shards else (),
+	}
+	for i, chunk in enumerate(writeHTML.markers.split(page)):
+		if i % 2:
+			for s in streams[chunk]():
+				f.write(s)
+		else:
+			f.write(chunk)
+writeHTML.marker = '\0{}\0'
+writeHTML.markers = re.compile(r'\0(imageCSS|content|searchIndex|shards)\0')
+writeHTML.dataElements = {
+	'shards': '<script id="card-shards" type="application/json">{}</script>',
+	'searchIndex': '<script id="search-index" type="application/json">{}</script>',
+}  # Client data elements, {placeholder: element}
+
+class RenderCache():
+	""" Processed titles and rendered cards, keyed by the options and the game template """
+	version = 1
+	idMarker = '\0id\0'
+	cardFields = ['title', 'summary', 'dlcs', '_searchable', 'developers', 'platformList', 'criticsScore', 'publishers', 'releaseDate', 'genres', 'themes', 'gameMins']
+
+	def __init__(self, fileName, options):
+		self.fileName = fileName
+		self.options = options
+		self.fingerprint = self.hash([self.version, options])
+		self.stats = {'titles': [0, 0], 'cards': [0, 0]}  # [hits, misses]
+		self.titles, self.cards = {}, {}
+		self._titles, self._cards = {}, {}
+		self._template = None
+		self.bound = False
+		if not fileName:
+			return  # In memory only
+		try:
+			with open(fileName, 'r', encoding='utf-8') as f:
+				data = json.load(f)
+			if self.fingerprint == data['fingerprint']:
+				self._titles = data['titles']
+				self._template = data['template']
+				self._cards = data['cards']
 			else:
-				row['_titleTL'] = re.sub(r'^' + articles + r'(.+?)$', r'\2, \1', unidecode(row['title']).lower()).strip()
-			for i in transliteratedTitleReplaceList:
-				row['_titleTL'] = re.sub(i[0], i[1], row['_titleTL'])
-			row['_titleTL'] = str.casefold(row['_titleTL']).replace('&quot;', '')
-
-			# Facilitate searches
-			row['_searchable'] = list(set([row['title'].lower().replace('&quot;', ''), row['_titleTL']]))
-			searchItem = row['_titleTL']
-			for srl in searchReplaceList:
-				for i in srl:
-					searchItem = re.sub(i[0], i[1], searchItem).strip()
-				if searchItem not in row['_searchable']:
-					row['_searchable'].append(searchItem)
-
-			# Try a roman numerals to digits conversion
-			searchItem = ' '.join([roman_numeral(x) for x in searchItem.split(' ')])
-			if searchItem not in row['_searchable']:
-				['_searchable'].append(searchItem)
-			
-			# Clean up the rest of the data for usage
-			for k in ['developers', 'dlcs', 'platformList', 'publishers', 'genres', 'themes', 'tags']:
-				if args.pythonLists:
-					row[k] = literal_eval(row[k]) if row[k] else []
-				else:
-					row[k] = row[k].split(args.delimiter)
-			for k in ['releaseDate', 'criticsScore']:
-				row[k] = clean(row[k])
+				print('Render cache invalidated: the options have changed')
+		except (OSError, ValueError, KeyError):
+			pass
+
+	@staticmethod
+	def hash(data):
+		return sha1(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+	def title(self, title):
+		""" Cached `titleData` """
+		if title in self._titles:
+			self.stats['titles'][0] += 1
+			data = self._titles[title]
+		else:
+			self.stats['titles'][1] += 1
+			data = titleData(title, self.options)
+		self.titles[title] = data
+		return data
+
+	def bindTemplate(self, template):
+		""" Sets the game template, and the data it depends on, the cards are rendered with,
+		    dropping the stale cards
+		"""
+		template = self.hash(template)
+		if self._template and (template != self._template):
+			print('Render cache invalidated: the game template has changed')
+			self._cards = {}
+		self._template = template
+		self.bound = True
+
+	def cardKey(self, game):
+		return self.hash([game[k] for k in self.cardFields])
+
+	def card(self, key):
+		""" The cached card HTML, or None if it has to be rendered """
+		html = self.cards.get(key, self._cards.get(key))
+		self.stats['cards'][0 if html is not None else 1] += 1
+		if html is not None:
+			self.cards[key] = html
+		return html
+
+	def storeCard(self, key, html):
+		self.cards[key] = html
+		return html
+
+	def save(self, bPrune=True):
+		""" Writes the cache file, if any, and keeps the entries used during this run for the next,
+		    or all of them without `bPrune`
+		"""
+		cards = self.cards if self.bound else self._cards
+		if not bPrune:
+			self.titles = {**self._titles, **self.titles}
+			if self.bound:
+				cards = {**self._cards, **cards}
+		if self.fileName:
+			try:
+				with open(self.fileName, 'w', encoding='utf-8') as f:
+					json.dump({
+						'fingerprint': self.fingerprint,
+						'titles': self.titles,
+						'template': self._template,
+						'cards': cards,
+					}, f)
+			except OSError:
+				print('Unable to write the render cache to “{}”'.format(self.fileName))
+		self._titles, self._cards = self.titles, cards
+		self.titles, self.cards = {}, {}
+		self.stats = {'titles': [0, 0], 'cards': [0, 0]}
+		self.bound = False
+
+	def __str__(self):
+		return 'Render cache: {} hits, {} misses (titles: {}/{}, cards: {}/{})'.format(
+			self.stats['titles'][0] + self.stats['cards'][0],
+			self.stats['titles'][1] + self.stats['cards'][1],
+			*self.stats['titles'], *self.stats['cards'],
+		)
+
+def titleData(title, options):
+	""" Cleans, renames and transliterates a title according to the user options.
+	    Returns None for the ignored games, or the (title, sortable title, search list) tuple
+	"""
+	# Fix common problems with titles
+	for i in titleData.titleReplaceList:
+		title = clean(i[0].sub(i[1], title))
+
+	# Skip or rename according to the user options
+	if options.ignoredGame(title):
+		return None
+	if title in options.renames:
+		title = options.renames[title]
+
+	# Transliterate and transform the title in a sortable/searchable ascii format
+	if title in options.sortAs:
+		# Custom sort name according to the user options
+		titleTL = options.sortAs[title]
+	else:
+		titleTL = titleData.sortable.sub(r'\2, \1', unidecode(title).lower()).strip()
+	for i in titleData.transliteratedTitleReplaceList:
+		titleTL = i[0].sub(i[1], titleTL)
+	titleTL = str.casefold(titleTL).replace('&quot;', '')
+
+	# Facilitate searches
+	searchable = list(dict.fromkeys([title.lower().replace('&quot;', ''), titleTL]))
+	searchItem = titleTL
+	for srl in titleData.searchReplaceList:
+		for i in srl:
+			searchItem = i[0].sub(i[1], searchItem).strip()
+		if searchItem not in searchable:
+			searchable.append(searchItem)
+
+	# Try a roman numerals to digits conversion
+	searchItem = ' '.join([roman_numeral(x) for x in searchItem.split(' ')])
+	if searchItem not in searchable:
+		searchable.append(searchItem)
+
+	return title, titleTL, searchable
+titleData.articles = '(' + '|'.join([
+	r'an?\s+', r'the\s+',  # English
+	r'il?\s+', r'l[oiae]\s+', r'gli\s+', r'un[oa]?\s+', r'(?:l|un)\''  # Italian
+]) + ')'
+titleData.sortable = re.compile(r'^' + titleData.articles + r'(.+?)$')  # Moves the articles at the end
+titleData.titleReplaceList = [
+	(re.compile(r'\.\.\.'), '…'),
+]  # Cleans the title
+titleData.transliteratedTitleReplaceList = [
+	(re.compile(r', ' + titleData.articles + r'$'), ''),
+	(re.compile(r'\(tm\)'), ''),
+	(re.compile(r'\(r\)'), ''),
+]  # Cleans the transliterated title, and removes useless things
+titleData.searchReplaceList = [
+	[
+		(re.compile(r'[,.…]'), ''),
+	], [
+		(re.compile(r'[;:\'-]'), ''),
+		(re.compile(r'[|\\/()]'), ' '),
+		(re.compile(r'\s{2,}'), ' '),
+	], [
+		(re.compile(r'([0-9])0{12}(\s|$)'), r'\1t\2'),
+		(re.compile(r'([0-9])0{9}(\s|$)'), r'\1g\2'),
+		(re.compile(r'([0-9])0{6}(\s|$)'), r'\1m\2'),
+		(re.compile(r'([0-9])0{3}(\s|$)'), r'\1k\2'),
+	]
+]  # Each list group creates a new permutation of the search string
+titleData.cacheSize = 8192  # Titles memoized per export, as the same game is often listed once per platform
+
+def loadTemplates():
+	""" {name: (file name, source)} of the templates, preferring the `.custom` overrides """
+	templates = {}
+	for k,l in {
+		'index': ['templates', 'index', '.html'],
+		'game': ['templates', 'game', '.html'],
+		'script': ['templates', 'script', '.js'],
+		'style': ['templates', 'style', '.css'],
+		'platforms': ['assets/icons', 'platforms', '.svg'],
+	}.items():
+		fn = '{0}/{1}{3}{2}'.format(l[0], l[1], l[2], '.custom' if exists('{0}/{1}.custom{2}'.format(l[0], l[1], l[2])) else '')
+		with open(fn, 'r', encoding='utf-8') as f:
+			templates[k] = (fn, CustomStringFormatter(f.read(-1)))
+	templates['platforms'] = (templates['platforms'][0], re.sub(r'\s*<!--.*?-->\s*', '', templates['platforms'][1]))
+	return templates
+
+def loadGames(args, options, titles=None):
+	""" Parses, merges and sorts the games of the CSV, returns None if it couldn't be used.
+	    `titles` is the memoized `titleData` to use, if any.
+	"""
+	if titles is None:
+		titles = lru_cache(maxsize=titleData.cacheSize)(lambda title: titleData(title, options))
 
-			games.append(row)
+	# Build the game data list
+	with open(args.fileCSV, 'r', encoding='utf-8', newline='') as csvfile:
+		rows = DictReader(csvfile, delimiter=args.delimiter)
+		if rows.fieldnames and not all(x in rows.fieldnames for x in Game.images):
+			print('Unable to find images: forgot to select a delimiter or to export them?')
+			return None
+		games = list(readGames(rows, args, options, titles))
+	profiler.lap('parse', len(games))
 
 	# Merge items based on the chosen list
-	for m in options['merge']:
-		for i in range(0, len(m)):
-			m[i] = clean(m[i])  # Match string escaping
-		try:
-			minto = next(games.index(x) for x in games if x['title'] == m[0])
-		except StopIteration:
-			continue
-		mitems = [games.index(x) for x in games if x['title'] in m and games.index(x) != minto]
-		for item in sorted(mitems, reverse=True):
-			for k in ['_searchable', 'developers', 'platformList', 'genres', 'themes']:
-				games[minto][k] = list(set(games[minto][k] + games[item][k]))
-			if games[minto]['releaseDate'] > games[item]['releaseDate']:
-				games[minto]['releaseDate'] = games[item]['releaseDate']
-			try:    pt1 = int(games[minto]['gameMins'])
-			except: pt1 = 0
-			try:    pt2 = int(games[item]['gameMins'])
-			except: pt2 = 0
-			games[minto]['gameMins'] = pt1 + pt2
-
-			del games[item]
+	games = mergeGames(games, options.mergeGroups, options.mergeTitles)
+	profiler.lap('merge', len(options['merge']))
 
 	# Casefold the transliterated title and sort the games by it
-	def sortableTitle(a, b):
-		for cs in options['customSort']:
-			if (a['title'] in cs) and (b['title'] in cs):
-				ai = cs.index(a['title'])
-				bi = cs.index(b['title'])
-				if ai == bi:
-					return 0
-				elif ai < bi:
-					return -1
-				else:
-					return 1
-		if a['_titleTL'] == b['_titleTL']:
-			return 0
-		ns = natsorted([a['_titleTL'], b['_titleTL']])
-		return -1 if ns[0] == a['_titleTL'] else 1
-	games = sorted(games, key=cmp_to_key(sortableTitle))
+	games = sortGames(games, options.customIndex)
+	profiler.lap('sort', len(games))
+	return games
 
+def updateImages(games, args, images, bPurge=True):
+	""" Purges the unused images, downloads and/or lists the missing ones, and with `--html5`
+	    renames and optimizes them. `images` is the set of the existing images, kept up to date.
+	"""
 	# Purge the old images that are no longer in use
-	images = ['images/{}'.format(f) for f in listdir('images') if ('.keep' != f) and isfile(join('images', f))]
+	unused = sorted(images - {image for game in games for image in game['_defaultImagePaths']}) if bPurge else []
 	delCount = 0
 	failCount = 0
-	for image in images:
-		if not any(x for x in games if image in x['_defaultImagePaths']):
+	if args.dryRun:
+		for image in unused:
+			print('Would purge “{}”'.format(image))
+	else:
+		for image in unused:
 			try:
 				remove(image)
+				images.discard(image)
 				delCount += 1
 			except:
 				failCount += 1
 	if delCount: print('Purged {} unused image{}'.format(delCount, 's' if 1 != delCount else ''))
 	if failCount: print('Failed to purge {} unused image{}'.format(failCount, 's' if 1 != failCount else ''))
+	profiler.lap('purge', len(unused))
 
-	# Export list of images
-	if args.imageList:
+	# Download the missing images and/or export their list
+	if args.imageList or args.downloadImages:
 		try:
 			makedirs(join(getcwd(), 'images'))
 		except: pass
 
-		# Find the best match for the image
-		images = []
+		# Find the best match for the image, once per path even if several games use it
+		downloads = {}
 		for game in games:
-			bFound = False
-			for image in game['_defaultImagePaths']:
-				if exists(image):
-					bFound = True
-					break
-			if not bFound:
-				images.append(game['_defaultImage'].replace('https://', 'http://'))
-
-		if not images:
-			try:
-				remove(args.fileImageList)
-			except: pass
+			if not any(image in images for image in game['_defaultImagePaths']):
+				downloads.setdefault(game['_defaultImagePaths'][0], game['_defaultImage'])
+		imageURLs = [url.replace('https://', 'http://') for url in downloads.values()]
+
+		if args.downloadImages and downloads:
+			downloaded, failed = ImageDownloader(args.downloadImages).download((url, path) for path, url in downloads.items())
+			if downloaded: print('Downloaded {} image{}'.format(downloaded, 's' if 1 != downloaded else ''))
+			if failed: print('Failed to download {} image{}'.format(len(failed), 's' if 1 != len(failed) else ''))
+			imageURLs = [url.replace('https://', 'http://') for url in failed]
+			failed = set(failed)
+			images.update(path for path, url in downloads.items() if url not in failed)
+
+		if not args.imageList:
+			pass
+		elif not imageURLs:
+			if exists(args.fileImageList):
+				removeFile(args.fileImageList, args.dryRun)
 			print('No new images to download')
 		else:
 			try:
 				with open(args.fileImageList, "w", encoding='utf-8') as ll:
-					ll.write('\n'.join(images))
+					ll.write('\n'.join(imageURLs))
 				print('Image list exported, it\'s suggested to download with `wget -nc -P images -i "{}"`'.format(args.fileImageList))
 			except FileNotFoundError:
 				print('Unable to write to “{}”, make sure that the path exists and that you have the write permissions'.format(args.fileImageList))
+		profiler.lap('images', len(downloads))
+
+	if not args.htmlExport:
+		return
+
+	# Image renamer
+	rename_count = 0
+	for gameID, game in exportedGames(games, args.debugEntryID):
+		paths = game['_defaultImagePaths']
+		for p in range(1, len(paths)):
+			if paths[p] in images:
+				if args.dryRun:
+					print('Would rename “{}” to “{}”'.format(paths[p], paths[0]))
+					continue
+				images.discard(paths[p])
+				try:
+					rename(paths[p], paths[0])
+					images.add(paths[0])
+					rename_count += 1
+				except:
+					removeFile(paths[p])
+	if rename_count:
+		print('Renamed {} images'.format(rename_count))
+	profiler.lap('rename', rename_count)
+
+	# Same covers from different URLs, the content hashes are only needed by these features
+	store = ImageStore() if args.dedupeImages or args.atlas or args.lazyImages else None
+	if store:
+		duplicates = dedupeImages(games, store, images)
+		if duplicates:
+			print('Collapsed {} duplicate image{}'.format(duplicates, 's' if 1 != duplicates else ''))
+		profiler.lap('dedupe', duplicates)
+
+	# Sprite atlases, or optimized versions of the images
+	if args.atlas:
+		spriteAtlases(games, store, args.atlas, args.optimizeImages or 342, args.imageFormat, images=images, bDryRun=args.dryRun)
+		profiler.lap('atlas', len(games))
+	elif args.optimizeImages:
+		optimizeImages(games, args.optimizeImages, args.imageFormat, args.imageSet, images=images, bDryRun=args.dryRun)
+		profiler.lap('optimize', len(games))
+
+	# Placeholders of the lazy covers
+	if args.lazyImages:
+		coverPlaceholders(games, store, images)
+		profiler.lap('placeholders', len(games))
+	if store:
+		store.save()
+
+def Main(args, options, cache=None, games=None, sources=None, bImages=True):
+	""" Runs the export. The render `cache` and the parsed, merged and sorted `games` can be
+	    kept between runs (see `watch`). The template `sources` and the images can be handled
+	    by the caller instead (see `batch`). Returns the games, or None if the CSV couldn't be used.
+	"""
+	if args.profile:
+		profiler.start(bool(args.profileStats))
+		profiler.record('options', options.cost[0], options.cost[1], count=options.cost[2])
+	try:
+		return export(args, options, cache, games, sources, bImages)
+	finally:
+		if args.profile:
+			profiler.save(args.profile, args.profileStats)  # Also stops the memory tracing
+
+def export(args, options, cache, games, sources, bImages):
+	""" The stages of `Main`, which profiles them """
+	if (cache is None) and args.cacheFile:
+		cache = RenderCache(args.cacheFile, options)
+	if cache:
+		profiler.lap('cache', len(cache._titles) + len(cache._cards))
+
+	if games is None:
+		games = loadGames(args, options, cache.title if cache else None)
+		if games is None:
+			return None
+
+	# Index the images on disk and update them
+	if bImages:
+		updateImages(games, args, imageSnapshot())
+
+	# Machine-readable exports of the same games
+	for fileName, bLines in [(args.fileJSON, False), (args.fileNDJSON, True)]:
+		if fileName:
+			try:
+				with open(fileName, 'w', encoding='utf-8') as f:
+					writeRecords(f, games, bLines, args.debugEntryID)
+				print('{} list exported'.format('NDJSON' if bLines else 'JSON'))
+			except FileNotFoundError:
+				print('Unable to write to “{}”, make sure that the path exists and that you have the write permissions'.format(fileName))
+			profiler.lap('ndjson' if bLines else 'json', len(games))
 
 	# Export HTML5
 	if args.htmlExport:
 		# Load the templates
+		if sources is None:
+			sources = loadTemplates()
 		templates = {}
-		for k,l in {
-			'index': ['templates', 'index', '.html'],
-			'game': ['templates', 'game', '.html'],
-			'script': ['templates', 'script', '.js'],
-			'style': ['templates', 'style', '.css'],
-			'platforms': ['assets/icons', 'platforms', '.svg'],
-		}.items():
-			fn = '{0}/{1}{3}{2}'.format(l[0], l[1], l[2], '.custom' if exists('{0}/{1}.custom{2}'.format(l[0], l[1], l[2])) else '')
+		for k, (fn, source) in sources.items():
 			if args.embed or (k not in ['script', 'style']):
-				with open(fn, 'r', encoding='utf-8') as f:
-					templates[k] = CustomStringFormatter(f.read(-1))
-					if 'style' == k:  # We can infer embedding
+				templates[k] = source
+				if 'style' == k:  # We can infer embedding
+					if args.bundle:
+						templates[k] = bundleFonts(templates[k], fn, dirname(args.fileHTML), args.dryRun)
+					else:
 						templates[k] = templates[k].replace('../assets/fonts/', 'assets/fonts/')
+			elif args.bundle:
+				templates[k] = bundleAsset(fn, dirname(args.fileHTML), args.dryRun)
 			else:
 				templates[k] = fn
-				continue
-		templates['platforms'] = re.sub(r'\s*<!--.*?-->\s*', '', templates['platforms'])
+
+		# Platform icons are resolved at build time, only the referenced symbols are shipped
+		platformIcons.symbols = spriteSymbols(templates['platforms'])
+		if False is args.debugEntryID:
+			icons = {platformIcon(x) for _, game in exportedGames(games) for x in game['platformList']}
+			templates['platforms'] = pruneSprite(templates['platforms'], {x if x in platformIcons.symbols else 'generic' for x in icons})
+		if cache:
+			cache.bindTemplate([templates['game'], platformIcons.symbols])
+		templates['game'] = GameTemplate(templates['game'], renderGame.fields, renderGame.hidden)
+		profiler.lap('templates', len(templates))
 
 		# Debug HTML
 		if False is args.debugEntryID:
@@ -497,79 +1953,231 @@ def Main(args, options):
 			debug_html = '<div id="debug">'
 
 			# Place all platform icons
-			debug_html += platformIcons(re.findall(r'<symbol[^>]*id="icon-platform-([^"]+)"', templates['platforms']), True)
+			debug_html += platformIcons(platformIcons.symbols, True)
 
 			# Remove empty SVGs
 			debug_html += '</div>'
 
-		# Single game HTML
-		gameID = len(games)  # start the ids from N (games count), to allow re-ordering in the range [0:N-1]
-		gameID = (gameID + 1000 - (gameID % 1000))  # Round it up to the thousands
-		games_html = ''
-		games_css = ''
-		rename_count = 0
-		for game in games:
-			gameID += 1
-			if args.debugEntryID and (gameID not in args.debugEntryID):
-				continue
-
-			# Image renamer
-			for p in range(1, len(game['_defaultImagePaths'])):
-				if exists(game['_defaultImagePaths'][p]):
-					try:
-						rename(game['_defaultImagePaths'][p], game['_defaultImagePaths'][0])
-						rename_count += 1
-					except:
-						try:
-							remove(game['_defaultImagePaths'][p])
-						except: pass
-
-			params = {
-				'id': gameID,
-				'title': game['title'],
-				'description': description(game['summary']),
-				'dlcs': delist(game['dlcs']),
-				'search': json.dumps(game['_searchable']).replace("'", "&apos;"),
-				'developers': delist(game['developers']),
-				'platforms': platformIcons(game['platformList']),
-				'score': game['criticsScore'],
-				'publishers': delist(game['publishers']),
-				'released': game['releaseDate'],
-				'genres': delist(game['genres']),
-				'themes': delist(game['themes']),
-				'playtime': duration(game['gameMins'])
-			}
-
-			game_html = templates['game'].format('a', **params)
-			games_css += '#game-{0}{{order:{0};background-image:url("{1}");}}'.format(gameID, game['_defaultImagePaths'][0])
-
-			# Remove parameters already printed
-			repeatable_fields.params = {x:params[x] for x in params if x not in templates['game'].used_keys() and isinstance(x, str)}
-			games_html += re.sub(r'(\s*){rep}(.*?){/rep}', repeatable_fields, game_html)
-
-		if rename_count:
-			print('Renamed {} images'.format(rename_count))
-
 		try:
-			with open(args.fileHTML, 'w', encoding='utf-8') as f:
-				css = ('<style>' + templates['style'] + '</style>') if args.embed else ('<link rel="stylesheet" type="text/css" href="' + templates['style'] + '">')
-				js = ('<script>' + templates['script'] + '</script>') if args.embed else ('<script src="' + templates['script'] + '"></script>')
-				f.write(templates['index'].format(**{
-					'language': 'en',
-					'title': args.title,
-					'imageCSS': '' if args.debugEntryID else games_css,
-					'style': css,
-					'javascript': js,
-					'content': games_html,
-					'platformIcons': templates['platforms'],
-					'debug': debug_html,
-				}))
+			# Bundles keep the previous file if nothing changed, to avoid compressing it again
+			fileHTML = (args.fileHTML + '.part') if args.bundle else args.fileHTML
+			with open(fileHTML, 'w', encoding='utf-8') as f:
+				writeHTML(f, games, args, templates, debug_html, cache)
+			if fileHTML != args.fileHTML:
+				if exists(args.fileHTML) and filecmp.cmp(fileHTML, args.fileHTML, shallow=False):
+					remove(fileHTML)
+				else:
+					replace(fileHTML, args.fileHTML)
 			print('HTML5 list exported')
 		except FileNotFoundError:
 			print('Unable to write to “{}”, make sure that the path exists and that you have the write permissions'.format(args.fileHTML))
-			return
+			return games
+		profiler.lap('html', profiler.stages.get('html: render', {}).get('count'))
+
+		# Precompressed copies
+		if args.bundle:
+			paths = [args.fileHTML]
+			if not args.embed:
+				paths += [join(dirname(args.fileHTML), templates[x]) for x in ['style', 'script']]
+			if args.shards:
+				directory = shardsDirectory(args.fileHTML)
+				paths += [join(directory, x) for x in listdir(directory) if x.endswith('.js')]
+			profiler.lap('bundle', compressBundle(paths))
+
+	if cache:
+		print(cache)
+		cache.save(not (args.debugEntryID or args.dryRun))  # Filtered runs keep the other entries
+		profiler.lap('cache')
+	return games
+
+def libraryRecords(argv=()):
+	""" Importable API: yields the records of the processed, merged and sorted games one at a
+	    time (see `gameRecord`), with the command line arguments in `argv`, e.g.
+	    `libraryRecords(['-i', 'gameDB.csv', '--py-lists'])`. Yields nothing if the CSV can't be used.
+	"""
+	args = parseArguments(list(argv))
+	games = loadGames(args, loadOptions(args.optionsFile)) if exists(args.fileCSV) else None
+	if games is not None:
+		yield from gameRecords(games, args.debugEntryID)
+
+def watchSnapshot(args):
+	""" {group: {path: (modification time, size)}} of the files the export depends on,
+	    directories are scanned one level deep
+	"""
+	snapshot = {}
+	for group, paths in {
+		'csv': [args.fileCSV],
+		'options': [args.optionsFile],
+		'templates': ['templates', 'assets/icons'],
+		'images': ['images'],
+	}.items():
+		files = {}
+		for path in paths:
+			try:
+				with scandir(path) as entries:
+					for x in entries:
+						if x.is_file():
+							st = x.stat()
+							files[x.path] = (st.st_mtime_ns, st.st_size)
+			except NotADirectoryError:
+				st = stat(path)
+				files[path] = (st.st_mtime_ns, st.st_size)
+			except FileNotFoundError:
+				pass
+		snapshot[group] = files
+	return snapshot
+
+def watch(args, interval=1.0):
+	""" Exports again whenever the inputs change, polling every `interval` seconds until CTRL+C """
+	global options
+	cache = RenderCache(args.cacheFile, options)
+	games = None
+	snapshot = None
+	changed = ['csv']
+	try:
+		while True:
+			if changed:
+				if 'options' in changed:
+					options = loadOptions(args.optionsFile)
+					cache = RenderCache(args.cacheFile, options)
+				if ('csv' in changed) or ('options' in changed):
+					games = None
+				if exists(args.fileCSV):
+					try:
+						games = Main(args, options, cache, games)
+					except Exception as e:
+						games = None
+						print('Export failed: {}'.format(e))
+				else:
+					print('Unable to find “{}”, waiting for it to be created'.format(args.fileCSV))
+				snapshot = watchSnapshot(args)  # Changes made by the export itself are ignored
+				print('Watching for changes, press CTRL+C to stop')
+
+			sleep(interval)
+			current = watchSnapshot(args)
+			changed = [x for x in current if current[x] != snapshot[x]]
+			if changed:
+				# Debounce: wait for the files to stop changing, i.e. while the CSV is written
+				while True:
+					sleep(watch.debounce)
+					settled = watchSnapshot(args)
+					if settled == current:
+						break
+					current = settled
+				changed = [x for x in current if current[x] != snapshot[x]]
+				if changed:
+					print('Changes detected in: {}'.format(', '.join(changed)))
+	except KeyboardInterrupt:
+		pass
+watch.debounce = 0.5
 
-if "__main__" == __name__:
+def initBatch(sources):
+	""" Process pool initializer: batch workers share the template sources """
+	batchExport.sources = sources
+
+def batchParse(argv):
+	""" Parses, merges and sorts the library of a batch job inside a worker process, returns
+	    (games, render cache, seconds), the games being None if the CSV couldn't be used
+	"""
+	global options
+	start = perf_counter()
+	args = parseArguments(argv)
+	options = loadOptions(args.optionsFile)
+	if not exists(args.fileCSV):
+		print('Unable to find “{}”'.format(args.fileCSV))
+		return None, None, perf_counter() - start
+	cache = RenderCache(args.cacheFile, options) if args.cacheFile else None
+	return loadGames(args, options, cache.title if cache else None), cache, perf_counter() - start
+
+def batchExport(job):
+	""" Exports the parsed games of a batch job inside a worker process, returns the seconds taken """
+	global options
+	argv, games, cache = job
+	start = perf_counter()
+	args = parseArguments(argv)
+	options = loadOptions(args.optionsFile)
+	Main(args, options, cache, games, sources=batchExport.sources, bImages=False)
+	return perf_counter() - start
+batchExport.sources = None
+
+def batch(fileName, argv):
+	""" Exports the libraries listed in the `fileName` JSON manifest, a list of jobs such as
+	    {"input": CSV, "options": JSON, "output": HTML, "title": title, "arguments": [...]},
+	    all the keys being optional and applied over the command line `argv`. The libraries are
+	    parsed and exported concurrently, sharing the templates, while the images are handled
+	    once for all of them: only the ones no library uses are purged, and each missing one
+	    is downloaded and optimized once, even if several libraries reference it.
+	"""
+	start = perf_counter()
+
+	# The command line of each job, without the batch itself
+	base = []
+	skip = False
+	for x in argv:
+		if skip:
+			skip = False
+		elif '--batch' == x:
+			skip = True
+		elif not x.startswith('--batch='):
+			base.append(x)
+	try:
+		with open(fileName, 'r', encoding='utf-8') as f:
+			manifest = json.loads(loadOptions.removeComments.sub('', f.read(-1)))
+		jobs = []
+		for job in manifest:
+			jobArgv = list(base)
+			for k, flag in batch.keys.items():
+				if k in job:
+					jobArgv += [flag, str(job[k])]
+			jobs.append(jobArgv + [str(x) for x in job.get('arguments', [])])
+	except (OSError, ValueError, TypeError, AttributeError) as e:
+		print('Unable to load the batch manifest “{}”: {}'.format(fileName, e))
+		return
+	if not jobs:
+		print('No jobs in the batch manifest “{}”'.format(fileName))
+		return
+	args = parseArguments(base)
+
+	# Each job needs its own output, the other files shared by several jobs are named after it
+	resolved = [parseArguments(x) for x in jobs]
+	names = [x.fileHTML for x in resolved]
+	outputs = [abspath(x) for x in names]
+	collisions = sorted({x for x, path in zip(names, outputs) if 1 < outputs.count(path)})
+	if collisions:
+		print('Several jobs of the batch manifest write to “{}”, give each one its own "output"'.format('”, “'.join(collisions)))
+		return
+	for dest, flag in batch.jobFiles.items():
+		paths = [abspath(getattr(x, dest)) if getattr(x, dest) else None for x in resolved]
+		for i, path in enumerate(paths):
+			if path and (1 < paths.count(path)):
+				jobs[i] += [flag, '{}.{}'.format(splitext(names[i])[0], basename(path))]
+
+	with ProcessPoolExecutor(min(len(jobs), cpu_count() or 1), initializer=initBatch, initargs=(loadTemplates(),)) as pool:
+		parsed = list(pool.map(batchParse, jobs))
+
+		# Shared images: a library that couldn't be parsed would have its images purged
+		imagesStart = perf_counter()
+		bParsed = all(games is not None for games, _, _ in parsed)
+		if not bParsed:
+			print('Skipping the purge of the unused images, not all the libraries could be parsed')
+		updateImages([game for games, _, _ in parsed if games for game in games], args, imageSnapshot(), bParsed)
+		imagesTime = perf_counter() - imagesStart
+
+		exported = iter(pool.map(batchExport, [(x, games, cache) for x, (games, cache, _) in zip(jobs, parsed) if games is not None]))
+		exports = [next(exported) if games is not None else None for games, _, _ in parsed]
+
+	# Summary of the timings
+	print('{:<40}{:>10}{:>12}{:>12}'.format('Job', 'Games', 'Parse (s)', 'Export (s)'))
+	for name, (games, _, parseTime), exportTime in zip(names, parsed, exports):
+		print('{:<40}{:>10}{:>12.3f}{:>12}'.format(name, len(games) if games is not None else 'failed', parseTime,
+			'{:.3f}'.format(exportTime) if exportTime is not None else ''))
+	count = sum(x is not None for x in exports)
+	print('Shared images in {:.3f}s, {} librar{} exported in {:.3f}s'.format(imagesTime, count, 'y' if 1 == count else 'ies', perf_counter() - start))
+batch.keys = {'input': '--input', 'options': '--options', 'output': '--output', 'title': '--title'}  # Manifest key → argument
+batch.jobFiles = {'cacheFile': '--cache', 'fileJSON': '--json', 'fileNDJSON': '--ndjson', 'profile': '--profile', 'profileStats': '--profile-stats'}  # Per job files → argument
+
+def parseArguments(argv=None):
+	""" Command line arguments, parsed from `argv` if provided """
 	def ba(variableName, description, defaultValue=False):
 		""" Boolean argument: creates a default boolean argument with the name of the storage variable and
 			the description to be shown in the help screen
@@ -581,7 +2189,7 @@ if "__main__" == __name__:
 			'dest': variableName,
 		}
 
-	args = Arguments(
+	return Arguments(
 		[
 			[
 				['-d'],
@@ -630,8 +2238,60 @@ if "__main__" == __name__:
 					'dest': 'fileHTML',
 				}
 			],
+			[
+				['--options'],
+				{
+					'default': 'options.json',
+					'type': str,
+					'nargs': 1,
+					'required': False,
+					'metavar': 'FN',
+					'help': 'pathname of the options file (defaults to `options.json`)',
+					'dest': 'optionsFile',
+				}
+			],
 			[['--image-list'], ba('imageList', 'create an image list')],
+			[
+				['--download-images'],
+				{
+					'default': False,
+					'const': 8,
+					'type': int,
+					'nargs': '?',
+					'required': False,
+					'metavar': 'N',
+					'help': 'download the missing cover images using N parallel connections (defaults to 8)',
+					'dest': 'downloadImages',
+				}
+			],
+			[['--dry-run'], ba('dryRun', 'list the files that would be purged, removed or renamed, without touching them')],
 			[['--html5'], ba('htmlExport', 'export the game list in html5 format')],
+			[
+				['--json'],
+				{
+					'default': False,
+					'const': 'games.json',
+					'type': str,
+					'nargs': '?',
+					'required': False,
+					'metavar': 'FN',
+					'help': 'export the processed games as a JSON array in FN (defaults to `games.json`)',
+					'dest': 'fileJSON',
+				}
+			],
+			[
+				['--ndjson'],
+				{
+					'default': False,
+					'const': 'games.ndjson',
+					'type': str,
+					'nargs': '?',
+					'required': False,
+					'metavar': 'FN',
+					'help': 'export the processed games as newline delimited JSON in FN (defaults to `games.ndjson`)',
+					'dest': 'fileNDJSON',
+				}
+			],
 			[
 				['--title'],
 				{
@@ -645,6 +2305,84 @@ if "__main__" == __name__:
 				}
 			],
 			[['--embed'], ba('embed', 'embeds CSS & JS instead of linking the resources')],
+			[['--bundle'], ba('bundle', 'link content-hashed copies of the CSS & JS next to the HTML file, and precompress the output')],
+			[
+				['--shards'],
+				{
+					'default': 0,
+					'const': 500,
+					'type': int,
+					'nargs': '?',
+					'required': False,
+					'metavar': 'N',
+					'help': 'store the game cards in separate files of N cards (defaults to 500), only the visible ones are rendered: for very large libraries',
+					'dest': 'shards',
+				}
+			],
+			[
+				['--optimize-images'],
+				{
+					'default': False,
+					'const': 342,
+					'type': int,
+					'nargs': '?',
+					'required': False,
+					'metavar': 'WIDTH',
+					'help': 'use resized copies of the images, up to WIDTH pixels wide (defaults to 342, the maximum cover width); requires Pillow',
+					'dest': 'optimizeImages',
+				}
+			],
+			[
+				['--image-format'],
+				{
+					'default': 'webp',
+					'type': str,
+					'choices': ['webp', 'avif', 'jpeg'],
+					'required': False,
+					'help': 'format of the optimized images (defaults to webp)',
+					'dest': 'imageFormat',
+				}
+			],
+			[['--image-set'], ba('imageSet', 'also create double resolution optimized images, for high density displays')],
+			[
+				['--atlas'],
+				{
+					'default': 0,
+					'const': 64,
+					'type': int,
+					'nargs': '?',
+					'required': False,
+					'metavar': 'N',
+					'help': 'pack the covers in sprite atlas sheets of N covers (defaults to 64), resized as with --optimize-images; requires Pillow',
+					'dest': 'atlas',
+				}
+			],
+			[['--dedupe-images'], ba('dedupeImages', 'reference identical images downloaded from different URLs once, by content hash')],
+			[['--lazy-images'], ba('lazyImages', 'load the covers only when they near the view, showing their dominant colour meanwhile')],
+			[
+				['--cache'],
+				{
+					'default': False,
+					'const': 'render.cache.json',
+					'type': str,
+					'nargs': '?',
+					'required': False,
+					'metavar': 'FN',
+					'help': 're-render only the new or changed games, caching the results in FN (defaults to `render.cache.json`)',
+					'dest': 'cacheFile',
+				}
+			],
+			[
+				['-j', '--jobs'],
+				{
+					'default': 1,
+					'type': int,
+					'required': False,
+					'metavar': 'N',
+					'help': 'number of processes used to render the game cards',
+					'dest': 'jobs',
+				}
+			],
 			[
 				['--debug'],
 				{
@@ -657,14 +2395,72 @@ if "__main__" == __name__:
 				}
 			],
 			[['--py-lists'], ba('pythonLists', 'the CSV has Python parseable instead of delimiter separated strings')],
+			[
+				['--watch'],
+				{
+					'default': False,
+					'const': 1.0,
+					'type': float,
+					'nargs': '?',
+					'required': False,
+					'metavar': 'SECONDS',
+					'help': 'keep running, and export again when the CSV, options, templates or images change, checking every SECONDS (defaults to 1)',
+					'dest': 'watch',
+				}
+			],
+			[
+				['--batch'],
+				{
+					'default': False,
+					'type': str,
+					'nargs': 1,
+					'required': False,
+					'metavar': 'FN',
+					'help': 'export the libraries listed in the FN JSON manifest concurrently, sharing the templates and the images',
+					'dest': 'batch',
+				}
+			],
+			[
+				['--profile'],
+				{
+					'default': False,
+					'const': 'profile.json',
+					'type': str,
+					'nargs': '?',
+					'required': False,
+					'metavar': 'FN',
+					'help': 'print the time, CPU and memory used by each stage, saving the report as JSON in FN (defaults to `profile.json`)',
+					'dest': 'profile',
+				}
+			],
+			[
+				['--profile-stats'],
+				{
+					'default': False,
+					'type': str,
+					'nargs': 1,
+					'required': False,
+					'metavar': 'FN',
+					'help': 'with --profile, save the cProfile statistics of the game cards rendering in FN',
+					'dest': 'profileStats',
+				}
+			],
 		],
+		argv=argv,
 		description='GOG Galaxy 2 export converter: parses the “GOG Galaxy 2 exporter” CSV to generate a list of cover images and/or a searchable HTML5 list of games.'
 	)
 
+if "__main__" == __name__:
+	args = parseArguments()
+
 	# Might extend options to allow pre-compiled command lists in the future
-	options = loadOptions()
-	if args.anyOption(['delimiter', 'fileCSV', 'fileImageList', 'fileHTML', 'title', 'debugEntryID']):
-		if exists(args.fileCSV):
+	options = loadOptions(args.optionsFile)
+	if args.anyOption(['delimiter', 'fileCSV', 'fileImageList', 'fileHTML', 'optionsFile', 'title', 'debugEntryID', 'jobs', 'cacheFile', 'imageFormat', 'atlas', 'shards', 'profile', 'profileStats', 'watch']):
+		if args.batch:
+			batch(args.batch, sys.argv[1:])
+		elif args.watch:
+			watch(args, args.watch)
+		elif exists(args.fileCSV):
 			Main(args, options)
 		else:
 			print('Unable to find “{}”, make sure to specify the proper path with “-i” (see --help)'.format(args.fileCSV))
@@ -7,34 +7,15 @@ document.addEventListener("DOMContentLoaded", function() {
     const gameSearch  = document.getElementById('search');
     const gameSize    = document.getElementById('width');
     const gameSpacing = document.getElementById('spacing');
+    const coverRatio  = 1.4093567251461988;  // .game::after aspect ratio
+    const bLazyCovers = 0 < cssPixels('--lazy-covers');  // Covers shown near the viewport only, see `--lazy-images`
 
     var X = 0,                          // Last known horizontal position
         Y = 0,                          // Last known vertical position
         bCursorShow = true,             // Should the cursor be shown again?
+        bMouseOut = false,              // Is the cursor out of the overlay?
         lastElement = {'id': null};     // Last element with an active tooltip
 
-    /* Python equivalent of string formatting */
-    String.prototype.format = function() {
-        var args = arguments;
-        this.unkeyed_index = 0;
-        return this.replace(/\{(\w*)\}/g, function(match, key) { 
-            if (key === '') {
-            key = this.unkeyed_index;
-            this.unkeyed_index++
-            }
-            if (key == +key) {
-                return args[key] !== 'undefined' ? args[key] : match;
-            } else {
-                for (var i = 0; i < args.length; i++) {
-                    if (typeof args[i] === 'object' && typeof args[i][key] !== 'undefined') {
-                        return args[i][key];
-                    }
-                }
-                return match;
-            }
-        }.bind(this));
-    };
-
     function updateTooltipPos(x, y) {
         if (updateTooltipPos.tooltip) {
             const t = updateTooltipPos.tooltip;
@@ -70,13 +51,103 @@ document.addEventListener("DOMContentLoaded", function() {
        a lot of time on loading. In order to have both the minimum
        necessary blank space and tooltips not resizing along the edges
        of the screen, we temporarily display & hide to calculate the
-       necessary width, before resetting both */
-    function initTooltip(element) {
-        element.style.visibility = 'hidden';
-        element.style.display = 'block';
-        element.style.minWidth = element.offsetWidth + 'px';
-        element.style.display = null;
-        element.style.visibility = null;
+       necessary width, before resetting both. The tooltips are handled
+       in batches, writing all the styles before reading all the widths,
+       so that a whole batch costs a single reflow */
+    function initTooltips(tooltips) {
+        const pending = tooltips.filter(function(t) { return !initTooltips.done.has(t); });
+        for (const t of pending) {
+            t.style.visibility = 'hidden';
+            t.style.display = 'block';
+        }
+        const widths = pending.map(function(t) { return t.offsetWidth; });
+        pending.forEach(function(t, i) {
+            t.style.minWidth = widths[i] + 'px';
+            t.style.display = null;
+            t.style.visibility = null;
+            initTooltips.done.add(t);
+        });
+    }
+    initTooltips.done = new WeakSet();  // Init static variable
+
+    function cssPixels(name) {
+        return parseFloat(getComputedStyle(games).getPropertyValue(name)) || 0;
+    }
+
+    /* Grid geometry index: the cards shown in display order, and the metrics to find the
+       card under a point without querying the layout. Rebuilt only when the cards size,
+       spacing, the search results or the page width change */
+    function cardGeometry() {
+        if (!cardGeometry.index) {
+            const width = cssPixels('--cover-width');
+            const spacing = cssPixels('--cover-spacing');
+            const cards = virtualGrid ? null : shownCards();
+            const count = virtualGrid ? virtualGrid.count() : cards.length;
+            const columns = Math.max(1, Math.min(count, Math.floor((games.clientWidth + spacing) / (width + spacing))));
+            const rect = games.getBoundingClientRect();
+            cardGeometry.index = {
+                'cards': cards,
+                'count': count,
+                'columns': columns,
+                'width': width,
+                'height': width * coverRatio,
+                'pitchX': width + spacing,
+                'pitchY': width * coverRatio + spacing,
+                // Document coordinates of the first card, the columns are centered
+                'left': rect.left + window.scrollX + (games.clientWidth - (columns * (width + spacing) - spacing)) / 2,
+                'top': rect.top + window.scrollY,
+            };
+        }
+        return cardGeometry.index;
+    }
+    cardGeometry.index = null;  // Init static variable
+
+    // Forget the grid geometry, it's rebuilt when needed
+    function invalidateGeometry() {
+        cardGeometry.index = null;
+    }
+
+    // The cards shown, in display order: the top search results, then the other hits in page order
+    function shownCards() {
+        if (!games.classList.contains('search-results'))
+            return gameList;
+        const top = new Set(showResults.top);
+        return showResults.top.concat(Array.from(showResults.results).filter(function(n) { return !top.has(n); })
+            .sort(function(a, b) { return a - b; })).map(function(n) { return gameList[n]; });
+    }
+
+    // Card at the k-th position of the grid, if it exists
+    function cardAtPosition(k) {
+        return virtualGrid ? virtualGrid.cardAt(k) : cardGeometry().cards[k];
+    }
+
+    // Card under the viewport coordinates, or null if there's none
+    function cardAt(x, y) {
+        const g = cardGeometry();
+        const dx = x + window.scrollX - g.left;
+        const dy = y + window.scrollY - g.top;
+        if ((dx < 0) || (dy < 0))
+            return null;
+        const column = Math.floor(dx / g.pitchX);
+        const row = Math.floor(dy / g.pitchY);
+        if ((column >= g.columns) || (dx - column * g.pitchX >= g.width) || (dy - row * g.pitchY >= g.height))
+            return null;  // Outside of the grid, or between the cards
+        const k = row * g.columns + column;
+        return (k < g.count) ? (cardAtPosition(k) || null) : null;
+    }
+
+    // Cards in the viewport
+    function cardsInView() {
+        const g = cardGeometry();
+        const first = Math.max(0, Math.floor((window.scrollY - g.top) / g.pitchY)) * g.columns;
+        const last = Math.min(g.count, Math.ceil((window.scrollY + window.innerHeight - g.top) / g.pitchY) * g.columns);
+        const cards = [];
+        for (var k = first; k < last; k++) {
+            const card = cardAtPosition(k);
+            if (card)
+                cards.push(card);
+        }
+        return cards;
     }
 
     // Wrapper for the continuous update of the range input controls
@@ -89,11 +160,17 @@ document.addEventListener("DOMContentLoaded", function() {
     // Update the game card width
     function onChangeSize(event) {
         games.style.setProperty('--cover-width', event.target.value + 'px');
+        invalidateGeometry();
+        if (virtualGrid)
+            virtualGrid.update();
     }
 
     // Update the game cards spacing
     function onChangeSpacing(event) {
         games.style.setProperty('--cover-spacing', event.target.value + 'px');
+        invalidateGeometry();
+        if (virtualGrid)
+            virtualGrid.update();
     }
 
     // Show/hide the input controls
@@ -104,6 +181,7 @@ document.addEventListener("DOMContentLoaded", function() {
             } else if (70 == event.keyCode) {
                 controls.classList.add('visible');  // Ctrl+F
             }
+            invalidateGeometry();  // The controls move the grid
 
             // Focus on the search bar, if visible
             if (controls.classList.contains('visible'))
@@ -116,70 +194,354 @@ document.addEventListener("DOMContentLoaded", function() {
         setTimeout(onSearch, 10, event);
     }
 
-    // Perform search on the games
-    function onSearch(event) {
-        var query = event.target.value.toLowerCase().replace(/^\s+|\s+$/g, '').replace(/\s{2,}/g, ' ');
-        if (query == onSearch.lastQuery)
-            return;
-        onSearch.lastQuery = query;
-        const bCancelSearch = 0 == query.length;
-        games.classList.toggle('search-results', !bCancelSearch);
+    /* Virtualized grid, used when the cards are exported in separate shards:
+       only the rows of cards in and around the viewport exist in the DOM, and
+       the card elements are recycled as the page scrolls */
+    const virtualGrid = (function() {
+        const config = document.getElementById('card-shards');
+        if (!config || !config.textContent.trim())
+            return null;
 
-        if (bCancelSearch) {
-            // Reset search results
-            for (const o of onSearch.results) {
-                gameList[o].classList.remove('hit');
-                gameList[o].style.order = null;
+        const shards = JSON.parse(config.textContent);
+        const cards = new Array(shards.count);  // Card HTML, filled as the shards load
+        const requested = new Set();            // Shards already requested
+        const rendered = new Map();             // Game position → card element
+        const pool = [];                        // Recycled card elements
+        const parser = document.createElement('div');
+        const buffer = 2;                       // Rows rendered outside of the viewport
+        var list = null;                        // Filtered game positions, or null for all the games
+        var bScheduled = false;
+
+        // Shards are plain scripts, in order to load from the local filesystem too
+        window.gameShard = function(n, data) {
+            for (var i = 0; i < data.length; i++)
+                cards[n * shards.size + i] = data[i];
+            update();
+        };
+
+        function requestShard(n) {
+            if (requested.has(n))
+                return;
+            requested.add(n);
+            const script = document.createElement('script');
+            script.src = shards.files[n];
+            document.body.appendChild(script);
+        }
+
+        // Fill a recycled element with the card's attributes and content
+        function cardElement(html) {
+            parser.innerHTML = html;
+            const source = parser.firstElementChild;
+            const element = pool.pop() || document.createElement('div');
+            element.id = source.id;
+            element.className = source.className;
+            if (bLazyCovers)
+                element.classList.add('cover');  // Only the cards around the viewport exist
+            element.replaceChildren(...source.childNodes);
+            return element;
+        }
+
+        function update() {
+            bScheduled = false;
+            const width = cssPixels('--cover-width');
+            const spacing = cssPixels('--cover-spacing');
+            const columns = Math.max(1, Math.floor((games.clientWidth + spacing) / (width + spacing)));
+            const rowHeight = width * coverRatio + spacing;
+            const count = list ? list.length : shards.count;
+            const rows = Math.ceil(count / columns);
+            const top = window.scrollY - (games.getBoundingClientRect().top + window.scrollY);
+            // Filtered lists can be shorter than the scrolled height, keep the last rows in view
+            const visibleRows = Math.ceil(window.innerHeight / rowHeight) + 2 * buffer;
+            const firstRow = Math.max(0, Math.min(Math.floor(top / rowHeight) - buffer, rows - visibleRows));
+            const lastRow = Math.min(rows, Math.ceil((top + window.innerHeight) / rowHeight) + buffer);
+
+            // Positions of the games to be shown
+            const visible = new Map();
+            for (var k = firstRow * columns; k < Math.min(count, lastRow * columns); k++)
+                visible.set(list ? list[k] : k, k);
+
+            // Recycle the cards that went out of view
+            for (const [i, element] of rendered) {
+                if (!visible.has(i)) {
+                    element.remove();
+                    pool.push(element);
+                    rendered.delete(i);
+                }
             }
-            onSearch.results = []
-        } else {
-            // Build a list of results
-            const filteredQuery = query.replace(/\s+/, '.*?');
-            var results = [];
-            for (var i = 0; i < gameList.length; i++) {
-                const searchData = JSON.parse(gameList[i].dataset.search);
-                for (const source of searchData) {
-                    if (-1 !== source.search(filteredQuery)) {
-                        results.push(i);
-                        break;
+
+            // Render the ones in view, requesting the missing shards
+            for (const [i, k] of visible) {
+                if (!rendered.has(i)) {
+                    if (undefined === cards[i]) {
+                        requestShard(Math.floor(i / shards.size));
+                        continue;
                     }
+                    const element = cardElement(cards[i]);
+                    rendered.set(i, element);
+                    games.appendChild(element);
+                }
+                rendered.get(i).style.order = k;
+            }
+
+            // Keep the scrollable height of the whole list
+            games.style.paddingTop = (firstRow * rowHeight) + 'px';
+            games.style.paddingBottom = (Math.max(0, rows - lastRow) * rowHeight) + 'px';
+        }
+
+        return {
+            // Coalesce the updates to one per frame
+            update: function() {
+                if (!bScheduled) {
+                    bScheduled = true;
+                    window.requestAnimationFrame(update);
+                }
+            },
+            // Show only the games at the given positions, or all of them with null
+            filter: function(positions) {
+                list = positions;
+                update();
+            },
+            // Number of games shown
+            count: function() {
+                return list ? list.length : shards.count;
+            },
+            // Card element at the k-th position, if rendered
+            cardAt: function(k) {
+                return rendered.get(list ? list[k] : k);
+            },
+        };
+    })();
+
+    /* Ranks the games matching a query, in a Web Worker or in the page through `scope` */
+    function searchWorker(scope) {
+        const sliceSize = 2000;             // Candidates scored before checking for newer queries
+        const cache = new Map();            // Decoded trigram postings
+        var index = {'strings': [], 'grams': {}};
+        var latest = 0;                     // Id of the most recent query
+
+        // Decode (and cache) the sorted positions of the games containing a trigram
+        function postings(gram) {
+            if (!cache.has(gram)) {
+                var p = [], n = 0;
+                if (Object.prototype.hasOwnProperty.call(index.grams, gram)) {
+                    for (const d of index.grams[gram].split(','))
+                        p.push(n += parseInt(d, 36));
                 }
+                cache.set(gram, p);
             }
-            // In with the new…
-            for (const n of results) {
-                if (!onSearch.results.includes(n)) {
-                    gameList[n].classList.add('hit');
-                    //gameList[o].style.order = /* for future weighted searches */
+            return cache.get(gram);
+        }
+
+        // Games containing all the trigrams of the search terms, or null if there are none to narrow the search
+        function searchCandidates(terms) {
+            var candidates = null;
+            for (const term of terms) {
+                for (var i = 0; i + 3 <= term.length; i++) {
+                    const p = postings(term.substr(i, 3));
+                    if (null === candidates) {
+                        candidates = p;
+                    } else {
+                        // Intersection of sorted lists
+                        var a = 0, b = 0, c = [];
+                        while (a < candidates.length && b < p.length) {
+                            if (candidates[a] < p[b]) a++;
+                            else if (candidates[a] > p[b]) b++;
+                            else { c.push(candidates[a]); a++; b++; }
+                        }
+                        candidates = c;
+                    }
+                    if (!candidates.length)
+                        return candidates;
                 }
             }
-            // … out with the old
-            for (const o of onSearch.results) {
-                if (!results.includes(o)) {
-                    gameList[o].classList.remove('hit');
-                    gameList[o].style.order = null;
+            return candidates;
+        }
+
+        // Whether the terms appear in order in the source string
+        function searchMatch(source, terms) {
+            var pos = 0;
+            for (const term of terms) {
+                pos = source.indexOf(term, pos);
+                if (-1 === pos)
+                    return false;
+                pos += term.length;
+            }
+            return true;
+        }
+
+        /* Score of the best matching search string: exact, prefix, word start, substring; -1 if none */
+        function searchScore(sources, query, terms) {
+            var best = -1;
+            for (var s = 0; s < sources.length; s++) {
+                const source = sources[s];
+                var tier;
+                if (source === query)
+                    tier = 0;
+                else if (source.startsWith(query))
+                    tier = 1;
+                else if (!searchMatch(source, terms))
+                    continue;
+                else
+                    tier = (' ' + source).includes(' ' + terms[0]) ? 2 : 3;
+                const score = 3 * tier + Math.min(s, 2);
+                if ((-1 === best) || (score < best))
+                    best = score;
+            }
+            return best;
+        }
+
+        function search(id, query) {
+            const terms = query.split(' ');
+            var candidates = searchCandidates(terms);
+            if (null === candidates)
+                candidates = Array.from(index.strings.keys());
+            const scored = [];
+            var k = 0;
+            (function slice() {
+                if (id !== latest)
+                    return;  // Stale
+                for (const end = Math.min(candidates.length, k + sliceSize); k < end; k++) {
+                    const score = searchScore(index.strings[candidates[k]], query, terms);
+                    if (-1 !== score)
+                        scored.push([score, candidates[k]]);
                 }
+                if (k < candidates.length)
+                    return setTimeout(slice, 0);
+
+                // Best score first, then page order
+                scored.sort(function(a, b) { return (a[0] - b[0]) || (a[1] - b[1]); });
+                scope.postMessage({'id': id, 'results': scored.map(function(x) { return x[1]; })});
+            })();
+        }
+
+        // {index}: the JSON search index, or the search lists of older custom templates
+        // {id, query}: a new query, cancelling the previous ones; no query only cancels
+        scope.onmessage = function(event) {
+            const data = event.data;
+            if (undefined !== data.index) {
+                index = ('string' === typeof data.index) ? JSON.parse(data.index) : data.index;
+                index.strings = index.strings.map(function(s) { return ('string' === typeof s) ? s.split('\n') : s; });
+                cache.clear();
+            } else {
+                latest = data.id;
+                if (data.query)
+                    search(data.id, data.query);
             }
-            onSearch.results = results;
+        };
+    }
+
+    // Lazy covers: the cards get their cover when nearing the viewport, and keep it
+    if (bLazyCovers && !virtualGrid) {
+        if ('IntersectionObserver' in window) {
+            const coverObserver = new IntersectionObserver(function(entries) {
+                for (const entry of entries) {
+                    if (entry.isIntersecting) {
+                        entry.target.classList.add('cover');
+                        coverObserver.unobserve(entry.target);
+                    }
+                }
+            }, {'rootMargin': '50% 0px'});
+            for (const card of gameList)
+                coverObserver.observe(card);
+        } else {
+            for (const card of gameList)
+                card.classList.add('cover');
         }
     }
-    onSearch.results = [];  // Init static variable
 
-    // Raycasting for easier tooltip management
+    // Search worker, with the index built by the exporter. Falls back on the cards data for older custom templates.
+    const searcher = (function() {
+        const data = document.getElementById('search-index');
+        const index = data ? data.textContent : {
+            'strings': Array.from(gameList, function(g) { return JSON.parse(g.dataset.search || '[]'); }),
+            'grams': {},
+        };
+        var worker;
+        try {
+            const source = new Blob(['(' + searchWorker.toString() + ')(self);'], {'type': 'text/javascript'});
+            worker = new Worker(URL.createObjectURL(source));  // Blob URLs also work from the local filesystem
+        } catch (e) {
+            // Same code in the page, through a message scope
+            const scope = {'postMessage': function(data) { worker.onmessage({'data': data}); }};
+            searchWorker(scope);
+            worker = {'postMessage': function(data) { scope.onmessage({'data': data}); }};
+        }
+        worker.postMessage({'index': index});
+        return worker;
+    })();
+
+    // Send the query to the search worker
+    function onSearch(event) {
+        var query = event.target.value.toLowerCase().replace(/^\s+|\s+$/g, '').replace(/\s{2,}/g, ' ');
+        if (query == onSearch.lastQuery)
+            return;
+        onSearch.lastQuery = query;
+        searcher.postMessage({'id': ++onSearch.id, 'query': query});
+        if (0 == query.length)
+            showResults(null);
+    }
+    onSearch.id = 0;  // Init static variable
+
+    // Ranked results of the latest query, the stale ones are ignored
+    function onSearchResults(event) {
+        if (event.data.id === onSearch.id)
+            showResults(event.data.results);
+    }
+
+    // Show the games at the ranked positions, or all of them with null
+    function showResults(ranked) {
+        invalidateGeometry();
+        if (virtualGrid)
+            return virtualGrid.filter(ranked);
+        games.classList.toggle('search-results', null !== ranked);
+
+        // In with the new…
+        const results = new Set(ranked || []);
+        for (const n of results) {
+            if (!showResults.results.has(n))
+                gameList[n].classList.add('hit');
+        }
+        // … out with the old
+        for (const o of showResults.results) {
+            if (!results.has(o))
+                gameList[o].classList.remove('hit');
+        }
+        showResults.results = results;
+
+        // Only the top results are moved ahead, the others keep the page order
+        for (const o of showResults.top)
+            gameList[o].style.order = null;
+        showResults.top = (ranked || []).slice(0, showResults.topCount);
+        showResults.top.forEach(function(n, k) { gameList[n].style.order = k - showResults.top.length; });
+    }
+    showResults.results = new Set();  // Init static variables
+    showResults.top = [];
+    showResults.topCount = 100;  // Results that are ordered by rank
+
+    // Hit testing for easier tooltip management, once per frame
     function onMouseEvent(event) {
         // Update coordinates on `mousemove` events
         if ('mousemove' === event.type) {
             X = event.offsetX;
             Y = event.offsetY;
+            bMouseOut = false;
+        } else if ('mouseout' === event.type) {
+            bMouseOut = true;
+        }
+        if (!onMouseEvent.bScheduled) {
+            onMouseEvent.bScheduled = true;
+            window.requestAnimationFrame(onMouseFrame);
         }
+    }
+    onMouseEvent.bScheduled = false;  // Init static variable
+
+    function onMouseFrame() {
+        onMouseEvent.bScheduled = false;
 
         // Based on current mouse coordinates find the relative game card
         var element = {'id': null};
-        if ('mouseout' !== event.type) {
-            const elements = document.elementsFromPoint(X, Y);
-            // .overlay #game-ID html
-            if (3 == elements.length)
-                element = elements[1];
-        }
+        if (!bMouseOut)
+            element = cardAt(X, Y) || element;
 
         if (element.id == lastElement.id) {
             // We're on the same card as before, update the tooltip position only
@@ -201,8 +563,11 @@ document.addEventListener("DOMContentLoaded", function() {
             if (element.id) {
                 const t = getTooltip(element);
                 updateTooltipPos.tooltip = t;
-                if ('' === t.style.visibility)
-                    initTooltip(t);
+                if (!initTooltips.done.has(t)) {
+                    // Measure the tooltips of all the cards in view at once
+                    const tooltips = cardsInView().map(getTooltip).filter(Boolean);
+                    initTooltips(tooltips.includes(t) ? tooltips : tooltips.concat([t]));
+                }
                 t.style.visibility = 'hidden';
                 updateTooltipPos(X, Y);
                 bCursorShow = false;
@@ -220,37 +585,20 @@ document.addEventListener("DOMContentLoaded", function() {
     overlay.addEventListener('mousemove', onMouseEvent);
     overlay.addEventListener('mouseout', onMouseEvent);
     window.addEventListener('scroll', onMouseEvent);
+    window.addEventListener('resize', invalidateGeometry);
     document.addEventListener('keyup', onToggleControls);
     hookRangeChange(gameSize, onChangeSize);
     hookRangeChange(gameSpacing, onChangeSpacing);
     gameSearch.addEventListener('blur', onSearchCancel);
     gameSearch.addEventListener('input', onSearch);
-
-    // Replace the SVG icon placeholders in reverse order to avoid position inconsistencies and skipped icons
-    (function replaceSVGplaceholders() {
-        p = {}  // cache
-        // class="pi pi-[platformName]"
-        const icons = document.getElementsByClassName('pi');
-        for (var i = icons.length-1; 0 <= i; i--) {
-            const platform = icons[i].classList[1].substr(3);
-            const platforms = Array.from(icons[i].classList).slice(1).join(' ');
-            try {
-                if (!p.hasOwnProperty(platform)) {
-                    // Maintain the symbols' view box and aspect ratios
-                    const symbol = document.getElementById('icon-platform-' + platform);
-                    p[platform] = '<svg class="platforms {1}" preserveAspectRatio="{2}" viewBox="{3}"><use xlink:href="#icon-platform-{0}" /></svg>'.format(
-                        platform,
-                        platforms,
-                        symbol.getAttribute('preserveAspectRatio'),
-                        symbol.getAttribute('viewBox'),
-                    );
-                }
-                icons[i].outerHTML = p[platform];
-            } catch(e) {}
-        }
-    })();
+    searcher.onmessage = onSearchResults;
 
     // Load finished, animate the game list in
+    if (virtualGrid) {
+        window.addEventListener('scroll', virtualGrid.update);
+        window.addEventListener('resize', virtualGrid.update);
+        virtualGrid.update();
+    }
     overlay.style.opacity = 0;
     overlay.style.cursor = 'initial';
 });
\ No newline at end of file